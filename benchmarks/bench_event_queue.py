@@ -0,0 +1,67 @@
+"""
+Measure push/pop throughput of the event queue backends using the classic
+hold model: the queue is filled with <size> events, and then each operation
+pops the earliest event and pushes a new one at an exponentially distributed
+time after it.
+
+Usage:
+  bench_event_queue.py [--size <n>...] [--ops <n>] [--seed <n>]
+  bench_event_queue.py (-h | --help)
+
+Options:
+  -h --help     Show this help.
+  --size <n>    Number of pending events [default: 1000 100000].
+  --ops <n>     Number of hold operations [default: 200000].
+  --seed <n>    Random seed [default: 0].
+"""
+
+import random
+from time import perf_counter
+
+from docopt import docopt
+
+from pfsim.event_queue import BinaryHeapQueue, CalendarQueue, LadderQueue
+from pfsim.simulator import Event
+
+from prettytable import PrettyTable
+
+
+BACKENDS = [BinaryHeapQueue, CalendarQueue, LadderQueue]
+
+
+def hold(queue_class, size, ops, seed):
+    rng = random.Random(seed)
+    queue = queue_class()
+
+    for seq in range(size):
+        queue.push(Event("hold", rng.expovariate(1.0), seq=seq))
+
+    start = perf_counter()
+
+    for seq in range(size, size + ops):
+        ev = queue.pop()
+        queue.push(Event("hold", ev.time + rng.expovariate(1.0), seq=seq))
+
+    return ops / (perf_counter() - start)
+
+
+def main():
+    args = docopt(__doc__)
+    ops = int(args["--ops"])
+    seed = int(args["--seed"])
+
+    table = PrettyTable()
+    table.field_names = ["Queue", "Pending Events", "Hold Ops/s"]
+    table.align = "r"
+
+    for size in map(int, args["--size"]):
+        for queue_class in BACKENDS:
+            table.add_row([queue_class.__name__, size,
+                           "{0:.0f}".format(hold(queue_class, size, ops,
+                                                 seed))])
+
+    print(table)
+
+
+if __name__ == "__main__":
+    main()
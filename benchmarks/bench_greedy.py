@@ -0,0 +1,104 @@
+"""
+Compare the Greedy routers scoring every equal-cost path against the dynamic
+programming over the shortest-path DAG, on a 3-level XGFT with random link
+loads. Both must choose the same paths.
+
+Usage:
+  bench_greedy.py [--m <m>] [--w <w>] [--pairs <n>] [--seed <n>]
+  bench_greedy.py (-h | --help)
+
+Options:
+  -h --help     Show this help.
+  --m <m>       Children per switch of each level [default: 8,8,8].
+  --w <w>       Parents per node of each level [default: 1,8,8].
+  --pairs <n>   Number of host pairs to route [default: 500].
+  --seed <n>    Random seed [default: 0].
+"""
+
+import random
+from time import perf_counter
+
+from docopt import docopt
+
+import networkx as nx
+
+import numpy as np
+
+from pfsim.host import Host
+from pfsim.link_state import LinkState
+from pfsim.router import GreedyRouter, GreedyRouter2
+from pfsim.topology import XGFTTopology
+
+from prettytable import PrettyTable
+
+
+# Score every path as the routers did before the dynamic programming
+def enumerate_paths(graph, links, src, dst, cost):
+    min_path = None
+    min_cost = float("inf")
+
+    for path in nx.all_shortest_paths(graph, src, dst):
+        c = cost([links.traffic[links.edge_id(u, v)]
+                  for u, v in zip(path, path[1:])])
+
+        if c < min_cost:
+            min_path = path
+            min_cost = c
+
+    return min_path
+
+
+def main():
+    args = docopt(__doc__)
+    m = [int(x) for x in args["--m"].split(",")]
+    w = [int(x) for x in args["--w"].split(",")]
+    rng = random.Random(int(args["--seed"]))
+
+    fabric = XGFTTopology(h=3, m=m, w=w).generate()
+    graph = fabric.to_networkx()
+    hosts = [Host(name, **attrs) for name, attrs in fabric.node_data()
+             if attrs["typ"] == "host"]
+
+    links = LinkState(fabric, {host.name for host in hosts})
+    links.traffic[:] = np.random.RandomState(int(args["--seed"])).randint(
+        0, 100, len(links))
+
+    pairs = [tuple(rng.sample(hosts, 2)) for _ in range(int(args["--pairs"]))]
+
+    table = PrettyTable()
+    table.field_names = ["Router", "Paths/Pair", "Enumerate [us/pair]",
+                         "DP [us/pair]", "Speedup"]
+    table.align = "r"
+
+    for router_class, cost in [(GreedyRouter, sum),
+                               (GreedyRouter2, lambda c: max(c, default=0))]:
+        router = router_class(fabric, hosts=hosts, links=links)
+        n_paths = sum(router.paths.count_paths(src.name, dst.name)
+                      for src, dst in pairs)
+
+        start = perf_counter()
+        expected = [enumerate_paths(graph, links, src.name, dst.name, cost)
+                    for src, dst in pairs]
+        t_enum = (perf_counter() - start) / len(pairs)
+
+        # Warm up the searches shared among all pairs, as in a simulation
+        for src, dst in pairs:
+            router.paths.optimal_path(src.name, dst.name, links.traffic)
+
+        start = perf_counter()
+        actual = [router.route(src, dst) for src, dst in pairs]
+        t_dp = (perf_counter() - start) / len(pairs)
+
+        assert actual == expected
+
+        table.add_row([router_class.__name__,
+                       "{0:.1f}".format(n_paths / len(pairs)),
+                       "{0:.1f}".format(t_enum * 1e6),
+                       "{0:.1f}".format(t_dp * 1e6),
+                       "{0:.1f}x".format(t_enum / t_dp)])
+
+    print(table)
+
+
+if __name__ == "__main__":
+    main()
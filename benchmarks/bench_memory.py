@@ -0,0 +1,128 @@
+"""
+Check that the resident memory of a long-running simulation stays flat. Jobs
+are submitted to a small XGFT cluster, and the resident set size is sampled
+every <interval> finished jobs. Metric collectors are left out as the samples
+they record grow with the simulated horizon by design.
+
+Usage:
+  bench_memory.py [--jobs <n>] [--interval <n>] [--router <class>]
+                  [--seed <n>]
+  bench_memory.py (-h | --help)
+
+Options:
+  -h --help          Show this help.
+  --jobs <n>         Number of jobs to run [default: 1000000].
+  --interval <n>     Number of jobs between samples [default: 100000].
+  --router <class>   Routing algorithm [default: pfsim.router.GreedyRouter].
+  --seed <n>         Random seed [default: 0].
+"""
+
+import json
+import random
+import resource
+import tarfile
+from importlib import import_module
+from io import BytesIO
+from os import sysconf
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from docopt import docopt
+
+from pfsim.cluster import Cluster
+from pfsim.host_selector import LinearHostSelector
+from pfsim.job_generator import JobGenerator
+from pfsim.math import ExponentialDistribution
+from pfsim.process_mapper import LinearProcessMapper
+from pfsim.scheduler import FCFSScheduler
+from pfsim.simulator import Simulator
+from pfsim.topology import XGFTTopology
+
+from prettytable import PrettyTable
+
+
+def write_trace(path, n_procs):
+    with tarfile.open(str(path), mode="w:gz") as tar:
+        for rank in range(n_procs):
+            buf = json.dumps({
+                "rank": rank,
+                "tx_messages": [int(rank != dst) for dst in range(n_procs)],
+                "tx_bytes": [100 * (rank + dst) for dst in range(n_procs)]
+            }).encode()
+
+            tarinfo = tarfile.TarInfo(name="pfprof{0}.json".format(rank))
+            tarinfo.size = len(buf)
+            tar.addfile(tarinfo, fileobj=BytesIO(buf))
+
+
+def rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Peak rather than current usage, but still shows unbounded growth
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def load_class(path):
+    mod_name, cls_name = path.rsplit(".", 1)
+
+    return getattr(import_module(mod_name), cls_name)
+
+
+def main():
+    args = docopt(__doc__)
+    n_jobs = int(args["--jobs"])
+    interval = int(args["--interval"])
+    random.seed(int(args["--seed"]))
+
+    with TemporaryDirectory() as tmpdir:
+        trace = Path(tmpdir) / "trace.tar.gz"
+        write_trace(trace, 16)
+
+        simulator = Simulator()
+        cluster = Cluster(
+            graph=XGFTTopology(h=2, m=[4, 4], w=[1, 2], npe=4).generate(),
+            host_selector=LinearHostSelector,
+            process_mapper=LinearProcessMapper,
+            scheduler=FCFSScheduler,
+            router=load_class(args["--router"]),
+            simulator=simulator
+        )
+        JobGenerator(submit=ExponentialDistribution(lambd=1.0),
+                     duration=ExponentialDistribution(lambd=0.5),
+                     trace=str(trace), hosts=cluster.hosts,
+                     simulator=simulator)
+
+        table = PrettyTable()
+        table.field_names = ["Jobs", "Events", "Wall Time [s]", "RSS [MiB]"]
+        table.align = "r"
+
+        start = perf_counter()
+        samples = []
+
+        while cluster.scheduler.n_finished < n_jobs:
+            simulator.step()
+
+            n_finished = cluster.scheduler.n_finished
+            if n_finished % interval or \
+                    (samples and samples[-1][0] == n_finished):
+                continue
+
+            samples.append((n_finished, rss()))
+            table.add_row([n_finished, simulator.n_events,
+                           "{0:.1f}".format(perf_counter() - start),
+                           "{0:.1f}".format(samples[-1][1] / 2 ** 20)])
+
+        print(table)
+
+        # Compare against the first sample after warm-up
+        if len(samples) > 2:
+            growth = samples[-1][1] - samples[1][1]
+            print("Growth since {0} jobs: {1:.1f} MiB".format(
+                samples[1][0], growth / 2 ** 20))
+
+
+if __name__ == "__main__":
+    main()
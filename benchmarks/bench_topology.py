@@ -0,0 +1,193 @@
+"""
+Measure the time and peak memory taken to generate 3-D tori and 3-level XGFTs
+of about <hosts> hosts, comparing the vectorized generators against the
+recursive ones they replaced. Both must produce the same fabric.
+
+Usage:
+  bench_topology.py [--hosts <n>...] [--w <w>]
+  bench_topology.py (-h | --help)
+
+Options:
+  -h --help     Show this help.
+  --hosts <n>   Approximate number of hosts [default: 1000 10000 100000].
+  --w <w>       Parents per node of each XGFT level [default: 1,4,4].
+"""
+
+import tracemalloc
+from functools import reduce
+from itertools import chain, count, islice, product
+from operator import mul
+from time import perf_counter
+
+from docopt import docopt
+
+import numpy as np
+
+from pfsim.fabric import Fabric
+from pfsim.topology import NDTorusTopology, XGFTTopology
+
+from prettytable import PrettyTable
+
+
+# Generators as they were before vectorization, adding one cycle or one
+# subtree at a time
+def recursive_torus(topology):
+    idx = 0
+    sources, targets = [], []
+
+    def _add_cycle(nodes):
+        nodes = list(nodes)
+        sources.extend(nodes)
+        targets.extend(nodes[1:] + nodes[:1])
+
+    def _generate(n, dims):
+        nonlocal idx
+
+        if n == 1:
+            nodes = range(idx, idx + dims[0])
+            _add_cycle(nodes)
+            _add_cycle(reversed(nodes))
+            idx += dims[0]
+            return
+
+        tmp = idx
+        for _ in range(dims[-1]):
+            _generate(n - 1, dims[:-1])
+
+        sz = reduce(mul, dims[:-1], 1)
+        for i in range(tmp, tmp + sz):
+            indices = range(i, dims[-1] * sz + i, sz)
+            _add_cycle(indices)
+            _add_cycle(reversed(indices))
+
+    _generate(topology.n, topology.dims)
+
+    coords = []
+    for i in range(idx):
+        digits = []
+        for k in topology.dims:
+            i, c = divmod(i, k)
+            digits.append(c)
+        coords.append(tuple(digits))
+
+    return Fabric.from_edges(
+        range(idx), sources, targets,
+        node_attrs={
+            "capacity": [topology.npe] * idx,
+            "typ": ["host"] * idx,
+            "coords": coords
+        },
+        edge_attrs={"capacity": np.full(len(sources), topology.bw)},
+        attrs={"topology": "torus", "dims": list(topology.dims)})
+
+
+def recursive_xgft(topology):
+    idx = count()
+    sources, targets = [], []
+    nodes = {}
+
+    def _generate(h, m, w, coords):
+        if h == 0:
+            i = next(idx)
+            nodes[i] = ("host", topology.npe, 0, coords)
+            return [i]
+
+        spines = list(islice(idx, reduce(mul, w, 1)))
+        for i, digits in zip(spines, product(*map(range, reversed(w)))):
+            nodes[i] = ("switch", None, h, tuple(reversed(digits)) + coords)
+
+        for i in range(m[-1]):
+            leaves = _generate(h - 1, m[:-1], w[:-1], (i,) + coords)
+            for u, v in chain(product(spines, leaves),
+                              product(leaves, spines)):
+                sources.append(u)
+                targets.append(v)
+
+        return spines
+
+    _generate(topology.h, topology.m, topology.w, ())
+
+    typ, capacity, level, coords = zip(*(nodes[i] for i in range(len(nodes))))
+
+    return Fabric.from_edges(
+        range(len(nodes)), sources, targets,
+        node_attrs={
+            "typ": list(typ),
+            "capacity": list(capacity),
+            "level": list(level),
+            "coords": list(coords)
+        },
+        edge_attrs={"capacity": np.full(len(sources), topology.bw)},
+        attrs={"topology": "xgft", "h": topology.h, "m": list(topology.m),
+               "w": list(topology.w)})
+
+
+# Split n into three factors as even as possible
+def factors(n):
+    a = max(1, round(n ** (1 / 3)))
+    b = max(1, round((n / a) ** (1 / 2)))
+
+    return [a, b, max(1, round(n / (a * b)))]
+
+
+# Time and peak memory are measured in separate runs as tracing allocations
+# slows Python code down much more than NumPy code
+def measure(generate):
+    start = perf_counter()
+    fabric = generate()
+    elapsed = perf_counter() - start
+    del fabric
+
+    tracemalloc.start()
+    fabric = generate()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return fabric, elapsed, peak
+
+
+def assert_same(a, b):
+    assert a.nodes == b.nodes
+    assert np.array_equal(a.indptr, b.indptr)
+    assert np.array_equal(a.indices, b.indices)
+    assert a.node_attrs == b.node_attrs
+    assert a.edge_attrs.keys() == b.edge_attrs.keys()
+    for key, column in a.edge_attrs.items():
+        assert np.array_equal(column, b.edge_attrs[key])
+    assert a.graph == b.graph
+
+
+def main():
+    args = docopt(__doc__)
+    w = [int(x) for x in args["--w"].split(",")]
+
+    table = PrettyTable()
+    table.field_names = ["Topology", "Hosts", "Nodes", "Links",
+                         "Recursive [s]", "Vectorized [s]",
+                         "Recursive [MiB]", "Vectorized [MiB]"]
+    table.align = "r"
+
+    for hosts in [int(n) for n in args["--hosts"]]:
+        dims = factors(hosts)
+
+        for name, topology, recursive in [
+                ("torus {0}".format("x".join(map(str, dims))),
+                 NDTorusTopology(n=3, dims=dims), recursive_torus),
+                ("xgft {0}".format(",".join(map(str, dims))),
+                 XGFTTopology(h=3, m=dims, w=w), recursive_xgft)]:
+            expected, t_rec, m_rec = measure(lambda: recursive(topology))
+            actual, t_vec, m_vec = measure(topology.generate)
+
+            assert_same(actual, expected)
+
+            table.add_row([name, reduce(mul, dims, 1), len(actual),
+                           actual.n_edges,
+                           "{0:.3f}".format(t_rec), "{0:.3f}".format(t_vec),
+                           "{0:.1f}".format(m_rec / 2 ** 20),
+                           "{0:.1f}".format(m_vec / 2 ** 20)])
+
+    print(table)
+
+
+if __name__ == "__main__":
+    main()
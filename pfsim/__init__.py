@@ -1,6 +1,9 @@
 """
 Usage:
   pfsim [-v | --verbose] [-p | --parallel <num_procs>] <path/to/scenario>
+  pfsim [-v | --verbose] compile-topology <path/to/graphml>...
+  pfsim [-v | --verbose] [-p | --parallel <num_procs>]
+        pack-trace <path/to/trace>...
   pfsim (-h | --help)
 
 Options:
@@ -15,7 +18,9 @@ from logging import getLogger
 
 from docopt import docopt
 
+from .graphml_cache import compile_graphml
 from .simulation_runner import SimulationRunner
+from .traffic_matrix import TrafficMatrix
 
 
 __VERSION__ = "1.0.0"
@@ -55,6 +60,24 @@ def main():
     args = docopt(__doc__, version=__VERSION__)
     configure_logging(verbose=args["--verbose"])
 
+    if args["compile-topology"]:
+        # Prebuild the compiled form of topologies to skip parsing them later
+        for path in args["<path/to/graphml>"]:
+            logger.info("Compiling %s", path)
+            compile_graphml(path)
+        return
+
+    if args["pack-trace"]:
+        workers = None
+        if args["--parallel"]:
+            workers = int(args["--parallel"][0])
+
+        # Convert trace tarballs into packed traces which load much faster
+        for path in args["<path/to/trace>"]:
+            logger.info("Packing %s", path)
+            TrafficMatrix.pack(path, workers)
+        return
+
     logger.info("Starting pfsim %s", __VERSION__)
 
     runner = SimulationRunner(args["<path/to/scenario>"])
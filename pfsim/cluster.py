@@ -1,31 +1,39 @@
-from collections import defaultdict
+from collections import OrderedDict
 from logging import getLogger
 
 import networkx as nx
 
+import numpy as np
+
 from prettytable import PrettyTable
 
 import yaml
 
+from .fabric import as_fabric
 from .host import Host
 from .host_selector import HostSelector
+from .link_state import LinkState
 from .process_mapper import ProcessMapper
 from .router import Router
+from .shortest_paths import ShortestPaths
 from .switch import Switch
 
 logger = getLogger(__name__)
 
 
 class Cluster:
+    # Host traffic of the least recently started workloads kept in memory
+    CACHE_SIZE = 64
+
     def __init__(self, graph, simulator=None, scheduler=None, router=None,
-                 host_selector=None, process_mapper=None):
+                 host_selector=None, process_mapper=None, router_params=None):
 
-        self.graph = graph
+        self.graph = as_fabric(graph)
 
         self.hosts = {}
         self.switches = {}
 
-        for name, attrs in self.graph.nodes_iter(data=True):
+        for name, attrs in self.graph.node_data():
             typ = attrs["typ"]
 
             if typ == "host":
@@ -37,23 +45,41 @@ class Cluster:
         assert issubclass(process_mapper, ProcessMapper)
         assert issubclass(router, Router)
 
-        self.scheduler = scheduler(hosts=self.hosts.values(),
+        # Lists rather than dict views, which cannot be pickled
+        hosts = list(self.hosts.values())
+        switches = list(self.switches.values())
+
+        self.scheduler = scheduler(hosts=hosts,
                                    simulator=simulator,
-                                   selector=host_selector(
-                                       hosts=self.hosts.values()),
+                                   selector=host_selector(hosts=hosts),
                                    mapper=process_mapper())
-        self.router = router(graph=self.graph, hosts=self.hosts.values(),
-                             switches=self.switches.values())
+        self.links = LinkState(self.graph, self.hosts)
+        # Switches each running job has installed FDB entries to
+        self._job_switches = {}
+        # Traffic between the hosts of a job given by their indices in
+        # job.hosts, keyed by workload
+        self._slot_traffic_cache = OrderedDict()
+        self.paths = ShortestPaths(self.graph)
+        if router_params is None:
+            router_params = {}
+        self.router = router(graph=self.graph, hosts=hosts,
+                             switches=switches, links=self.links,
+                             paths=self.paths, **router_params)
         self.simulator = simulator
-        self.simulator.register("job.started", self._job_started)
-        self.simulator.register("job.finished", self._job_finished)
+        self.simulator.subscribe("job.started", self._job_started)
+        self.simulator.subscribe("job.finished", self._job_finished)
 
-        for u, v, attrs in self.graph.edges_iter(data=True):
-            attrs["traffic"] = 0.0
-            attrs["flows"] = 0
+    def _update_fdbs(self, src, dst, link_ids, job):
+        switches = self._job_switches.setdefault(job, set())
+
+        # Every link but the first one leaves a node forwarding the packets
+        for link in link_ids[1:].tolist():
+            u, v = self.links.edge(link)
+
+            # Hosts forward packets themselves in direct networks such as tori
+            if u not in self.switches:
+                continue
 
-    def _update_fdbs(self, src, dst, path, job):
-        for u, v in zip(path[1:-1], path[2:]):
             switch = self.switches[u]
             if v in self.switches:
                 next_node = self.switches[v]
@@ -61,54 +87,94 @@ class Cluster:
                 next_node = self.hosts[v]
 
             switch.fdb.add(src, dst, next_node, job)
+            switches.add(switch)
 
-    def _job_started(self, job):
-        host_tm = defaultdict(lambda: 0)
-        host_fm = defaultdict(lambda: 0)
+    def _slot_traffic(self, job):
+        # Aggregate the traffic between ranks into traffic between hosts
+        matrix, flows = job.traffic_matrix.aggregate(
+            job.rank_hosts, len(job.hosts), return_counts=True)
+        src, dst, traffic = matrix.coo
+
+        # Heaviest pairs first, ties in the order of the matrix
+        order = matrix.top_k()
+
+        return list(zip(src[order].tolist(), dst[order].tolist(),
+                        traffic[order].tolist(), flows[order].tolist()))
 
-        for (src_rank, dst_rank), traffic in job.traffic_matrix.dok.items():
-            src_host = job.procs[src_rank].host
-            dst_host = job.procs[dst_rank].host
+    def _host_traffic(self, job):
+        # Jobs of the same trace whose ranks are mapped to the same slots,
+        # i.e. indices in job.hosts, have the same traffic up to relabeling
+        # the hosts. The trace is identified by its path so that the cache
+        # does not keep its matrix in memory.
+        if job.trace is None:
+            slot_traffic = self._slot_traffic(job)
+        else:
+            key = (job.trace, len(job.hosts), job.rank_hosts.tobytes())
+            cache = self._slot_traffic_cache
 
-            host_tm[(src_host, dst_host)] += traffic
-            host_fm[(src_host, dst_host)] += 1
+            slot_traffic = cache.get(key)
+            if slot_traffic is None:
+                slot_traffic = cache[key] = self._slot_traffic(job)
 
-        host_adj_list = list(host_tm.items())
-        host_adj_list.sort(key=lambda x: x[1], reverse=True)
+                while len(cache) > self.CACHE_SIZE:
+                    cache.popitem(last=False)
+            else:
+                cache.move_to_end(key)
 
-        for (src_host, dst_host), traffic in host_adj_list:
-            path = self.router.route(src_host, dst_host, job)
+        hosts = job.hosts
 
-            self._update_fdbs(src_host, dst_host, path, job)
+        return [(hosts[src], hosts[dst], traffic, flows)
+                for src, dst, traffic, flows in slot_traffic]
 
-            for u, v in zip(path[1:-1], path[2:-1]):
-                edge = self.graph[u][v]
-                edge["traffic"] += traffic
-                edge["flows"] += host_fm[(src_host, dst_host)]
-                job.link_usage[(u, v)] += traffic
-                job.link_flows[(u, v)] += host_fm[(src_host, dst_host)]
+    def _job_started(self, job):
+        host_pairs = self._host_traffic(job)
+        link_ids = []
+
+        # Paths are routed one at a time as the links are loaded
+        pairs = [(src, dst) for src, dst, _, _ in host_pairs]
+        paths = self.router.route_many(pairs, job)
+
+        for pair, ids in zip(host_pairs, paths):
+            src_host, dst_host, traffic, flows = pair
+            self._update_fdbs(src_host, dst_host, ids, job)
+
+            # Links of the network along the path, leaving out the links
+            # between hosts and switches at both ends
+            ids = ids[self.links.network[ids]]
+            self.links.add(ids, traffic, flows)
+            link_ids.append(ids)
+
+        # Aggregate the load of this job on each link to remove it later
+        if host_pairs:
+            _, _, traffic, flows = zip(*host_pairs)
+            lengths = [len(ids) for ids in link_ids]
+
+            ids, inverse = np.unique(np.concatenate(link_ids),
+                                     return_inverse=True)
+            job.link_ids = ids
+            job.link_usage = np.bincount(inverse, np.repeat(traffic, lengths),
+                                         len(ids))
+            job.link_flows = np.bincount(inverse, np.repeat(flows, lengths),
+                                         len(ids)).astype(np.int64)
 
         # Compute return paths if not already installed
-        for (src_host, dst_host), traffic in host_adj_list:
-            # Return path is already installed
-            if self.router.cache.has(dst_host, src_host):
-                continue
+        return_pairs = [(dst_host, src_host)
+                        for src_host, dst_host, _, _ in host_pairs
+                        if not self.router.cache.has(dst_host, src_host)]
 
-            # Compute return paths
-            path = self.router.route(dst_host, src_host)
-            self._update_fdbs(dst_host, src_host, path, job)
+        for (src_host, dst_host), ids in zip(
+                return_pairs, self.router.route_many(return_pairs)):
+            self._update_fdbs(src_host, dst_host, ids, job)
 
     def _job_finished(self, job):
         # Clear FDB for this job
-        for switch in self.switches.values():
+        for switch in self._job_switches.pop(job, ()):
             switch.fdb.remove_job(job)
 
         # Clear routing cache for this job
         self.router.cache.remove_job(job)
 
-        for u, v in job.link_usage.keys():
-            self.graph[u][v]["traffic"] -= job.link_usage[(u, v)]
-            self.graph[u][v]["flows"] -= job.link_flows[(u, v)]
+        self.links.remove(job.link_ids, job.link_usage, job.link_flows)
 
     def submit_job(self, job, time=0.0):
         self.simulator.schedule("job.submitted", time, job=job)
@@ -123,7 +189,7 @@ class Cluster:
         table.add_row(["Number of Allocated Hosts",
                        len([h for h in self.hosts.values() if h.allocated])])
         table.add_row(["Number of Switches", len(self.switches)])
-        table.add_row(["Number of Links", self.graph.size()])
+        table.add_row(["Number of Links", self.graph.n_edges])
 
         f.write("Cluster Status\n")
         f.write(str(table))
@@ -132,7 +198,8 @@ class Cluster:
     def write_flowtable(self, f):
         output = {}
 
-        graph = nx.Graph(self.graph)
+        directed = self.graph.to_networkx()
+        graph = nx.Graph(directed)
         mst = nx.minimum_spanning_tree(graph)
         # Links that need to be disabled
         diff = nx.difference(graph, mst)
@@ -146,12 +213,12 @@ class Cluster:
                 output[switch.dpid]["fdb"][src.mac] = {}
 
                 for dst, nex in switch.fdb._fdb[src].items():
-                    port = self.graph[switch.name][nex.name]["port"]
+                    port = directed[switch.name][nex.name]["port"]
                     output[switch.dpid]["fdb"][src.mac][dst.mac] = port
 
             # Write list of blocked ports (to remove loops)
             output[switch.dpid]["blocked_ports"] = [
-                self.graph[switch.name][u]["port"] for u in
+                directed[switch.name][u]["port"] for u in
                 diff.neighbors_iter(switch.name)
             ]
 
@@ -1,10 +1,14 @@
 from logging import getLogger
+from math import sqrt
 from pathlib import Path
 
-from .statistics import Samples, TimeSeriesSamples
+import numpy as np
+
+from .statistics import MaxSegmentTree, Samples, TimeSeriesSamples
 
 logger = getLogger(__name__)
 inf = float("inf")
+nan = float("nan")
 
 
 class MetricsCollector:
@@ -44,10 +48,10 @@ class SchedulerMetricsCollector(MetricsCollector):
             self.response_time
         ]
 
-        simulator.register("job.submitted", self._collect, prio=-inf)
-        simulator.register("job.started", self._collect, prio=-inf)
-        simulator.register("job.finished", self._collect, prio=-inf)
-        simulator.register("job.finished", self._finished, prio=-inf)
+        simulator.subscribe("job.submitted", self._collect, prio=-inf)
+        simulator.subscribe("job.started", self._collect, prio=-inf)
+        simulator.subscribe("job.finished", self._collect, prio=-inf)
+        simulator.subscribe("job.finished", self._finished, prio=-inf)
 
     def _finished(self, job, **kwargs):
         self.wait_time.add(job.started_at - job.created_at)
@@ -64,6 +68,11 @@ class SchedulerMetricsCollector(MetricsCollector):
 
 
 class InterconnectMetricsCollector(MetricsCollector):
+    # The running sums are recomputed from scratch once the squares added to
+    # and subtracted from them outgrow the squared deviation by this factor,
+    # as the rounding errors would not be negligible anymore
+    MAX_CANCELLATION = 1e6
+
     def __init__(self, simulator, cluster):
         super().__init__(simulator, cluster)
 
@@ -77,22 +86,67 @@ class InterconnectMetricsCollector(MetricsCollector):
             self.max_flows
         ]
 
-        simulator.register("job.started", self._collect, prio=-inf)
-        simulator.register("job.finished", self._collect, prio=-inf)
-
-    def _collect(self, **kwargs):
+        # Congestion and flows of the links of the network, which are
+        # updated only where a job has changed the load
+        links = cluster.links
+        ids = links.network_links
+        self._position = np.full(len(links), -1, np.int64)
+        self._position[ids] = np.arange(len(ids))
+
+        self._congestion = links.traffic[ids] / links.capacity[ids]
+        self._congestion_tree = MaxSegmentTree(self._congestion)
+        self._flows_tree = MaxSegmentTree(links.flows[ids])
+        self._rebuild()
+
+        simulator.subscribe("job.started", self._collect, prio=-inf)
+        simulator.subscribe("job.finished", self._collect, prio=-inf)
+
+    def _rebuild(self):
+        # Sums are taken around the mean to avoid cancellation
+        self._shift = self._congestion.mean() if len(self._congestion) else 0.0
+        deviation = self._congestion - self._shift
+        self._sum = float(deviation.sum())
+        self._sum_sq = float(np.dot(deviation, deviation))
+        self._magnitude = self._sum_sq
+
+    def _update(self, link_ids):
+        links = self.cluster.links
+        positions = self._position[link_ids]
+        positions = positions[positions >= 0]
+        link_ids = links.network_links[positions]
+
+        old = self._congestion[positions] - self._shift
+        congestion = links.traffic[link_ids] / links.capacity[link_ids]
+        self._congestion[positions] = congestion
+        new = congestion - self._shift
+
+        new_sq = float(np.dot(new, new))
+        old_sq = float(np.dot(old, old))
+        self._sum += float((new - old).sum())
+        self._sum_sq += new_sq - old_sq
+        self._magnitude += new_sq + old_sq
+
+        self._congestion_tree.update(positions, congestion)
+        self._flows_tree.update(positions, links.flows[link_ids])
+
+    def _collect(self, job=None, **kwargs):
         time = self.simulator.time
 
-        flow = Samples("Number of Flows", store=False)
-        congestion = Samples("Congestion", store=False)
+        if job is not None:
+            self._update(job.link_ids)
+
+        self.max_congestion.add(time, self._congestion_tree.max)
+        self.stddev_congestion.add(time, self._stddev())
+        self.max_flows.add(time, self._flows_tree.max)
 
-        for u, v, attrs in self.cluster.graph.edges_iter(data=True):
-            if u in self.cluster.hosts or v in self.cluster.hosts:
-                continue
+    def _stddev(self):
+        n = len(self._congestion)
+        if n < 2:
+            return nan
 
-            congestion.add(attrs["traffic"] / attrs["capacity"])
-            flow.add(attrs["flows"])
+        m2 = self._sum_sq - self._sum ** 2 / n
+        if self._magnitude > self.MAX_CANCELLATION * m2:
+            self._rebuild()
+            m2 = self._sum_sq - self._sum ** 2 / n
 
-        self.max_congestion.add(time, congestion.max)
-        self.stddev_congestion.add(time, congestion.sd)
-        self.max_flows.add(time, flow.max)
+        return sqrt(max(m2, 0.0) / (n - 1))
@@ -1,11 +1,20 @@
 from collections import namedtuple
 from itertools import product
 
-from schema import Or, Schema
+from schema import Optional, Or, Schema
 
 
+DEFAULT_EVENT_QUEUE = "pfsim.event_queue.BinaryHeapQueue"
+
 EXPERIMENT_CONF_SCHEMA = Schema({
     "duration": Or(int, float),
+    Optional("event_queue"): str,
+    Optional("checkpoint_interval"): Or(int, float),
+    Optional("profile"): bool,
+    Optional("share_timeline"): bool,
+    Optional("route_cache"): str,
+    Optional("router_seed"): int,
+    Optional("trace_workers"): int,
     "topology": [{
         "kind": str,
         "params": {
@@ -77,7 +86,14 @@ _Scenario = namedtuple(
         "host_selector",
         "process_mapper",
         "router",
-        "jobs"
+        "jobs",
+        "event_queue",
+        "checkpoint_interval",
+        "profile",
+        "share_timeline",
+        "route_cache",
+        "router_seed",
+        "trace_workers"
     ]
 )
 
@@ -113,4 +129,11 @@ class Scenario(_Scenario):
                       host_selector=hs,
                       process_mapper=pm,
                       router=rt,
-                      jobs=jobs)
+                      jobs=jobs,
+                      event_queue=d.get("event_queue", DEFAULT_EVENT_QUEUE),
+                      checkpoint_interval=d.get("checkpoint_interval"),
+                      profile=d.get("profile", False),
+                      share_timeline=d.get("share_timeline", True),
+                      route_cache=d.get("route_cache"),
+                      router_seed=d.get("router_seed"),
+                      trace_workers=d.get("trace_workers"))
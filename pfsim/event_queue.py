@@ -0,0 +1,375 @@
+from abc import ABC, abstractmethod
+from heapq import heapify, heappop, heappush
+from logging import getLogger
+
+logger = getLogger(__name__)
+inf = float("inf")
+
+
+# Events are ordered by their time and then by their sequence number, so
+# that simultaneous events are delivered in the order they were scheduled.
+#
+# Cancelled events are left in place as tombstones and skipped when they
+# reach the head of the queue. Once tombstones make up too large a fraction
+# of the stored events, the backend is asked to drop them all at once.
+class EventQueue(ABC):
+    COMPACT_RATIO = 0.5
+    COMPACT_MIN = 64
+
+    def __init__(self, **kwargs):
+        # Number of stored events including tombstones
+        self._n_events = 0
+        self._n_cancelled = 0
+
+    def push(self, ev):
+        ev.pending = True
+        self._n_events += 1
+        self._push(ev)
+
+    # Remove and return the earliest event
+    def pop(self):
+        if not len(self):
+            raise IndexError("pop from an empty event queue")
+
+        while True:
+            self._n_events -= 1
+            ev = self._pop()
+
+            if not ev.cancelled:
+                ev.pending = False
+                return ev
+
+            self._n_cancelled -= 1
+
+    # Return the earliest event without removing it, or None if empty
+    def peek(self):
+        while self._n_events:
+            ev = self._peek()
+
+            if not ev.cancelled:
+                return ev
+
+            self._n_events -= 1
+            self._n_cancelled -= 1
+            self._pop()
+
+        return None
+
+    def cancel(self, ev):
+        if not ev.pending:
+            return False
+
+        ev.pending = False
+        ev.cancelled = True
+        self._n_cancelled += 1
+
+        if self._n_cancelled >= self.COMPACT_MIN and \
+                self._n_cancelled > self.COMPACT_RATIO * self._n_events:
+            self._n_events -= self._n_cancelled
+            self._n_cancelled = 0
+            self._compact()
+
+        return True
+
+    def __len__(self):
+        return self._n_events - self._n_cancelled
+
+    @abstractmethod
+    def _push(self, ev):  # pragma: no cover
+        pass
+
+    @abstractmethod
+    def _pop(self):  # pragma: no cover
+        pass
+
+    @abstractmethod
+    def _peek(self):  # pragma: no cover
+        pass
+
+    # Remove all cancelled events
+    @abstractmethod
+    def _compact(self):  # pragma: no cover
+        pass
+
+
+class BinaryHeapQueue(EventQueue):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._heap = []
+
+    # push() and pop() are inlined as this is the default backend
+    def push(self, ev):
+        ev.pending = True
+        self._n_events += 1
+        heappush(self._heap, ev)
+
+    def pop(self):
+        heap = self._heap
+
+        while True:
+            ev = heappop(heap)
+            self._n_events -= 1
+
+            if not ev.cancelled:
+                ev.pending = False
+                return ev
+
+            self._n_cancelled -= 1
+
+    def _push(self, ev):  # pragma: no cover
+        heappush(self._heap, ev)
+
+    def _pop(self):
+        return heappop(self._heap)
+
+    def _peek(self):
+        return self._heap[0]
+
+    def _compact(self):
+        self._heap = [ev for ev in self._heap if not ev.cancelled]
+        heapify(self._heap)
+
+
+class CalendarQueue(EventQueue):
+    # c.f. R. Brown, "Calendar Queues: A Fast O(1) Priority Queue
+    # Implementation for the Simulation Event Set Problem," Commun. ACM,
+    # vol. 31, no. 10, pp. 1220-1227, 1988.
+
+    MIN_BUCKETS = 2
+    N_SAMPLES = 25
+
+    def __init__(self, n_buckets=2, width=1.0, **kwargs):
+        super().__init__(**kwargs)
+        self._init(n_buckets, width)
+
+    def _init(self, n_buckets, width):
+        self._buckets = [[] for _ in range(n_buckets)]
+        self._n_buckets = n_buckets
+        self._width = width
+        # Virtual bucket (bucket index without wrapping around) to dequeue
+        # the next event from
+        self._current = 0
+        self._grow_at = 2 * n_buckets
+        self._shrink_at = n_buckets // 2 - 2
+
+    def _virtual_bucket(self, time):
+        return int(time / self._width)
+
+    def _push(self, ev):
+        vb = self._virtual_bucket(ev.time)
+        self._insert(ev, vb)
+
+        # Events may be scheduled before the current position
+        if vb < self._current:
+            self._current = vb
+
+        if self._n_events > self._grow_at:
+            self._resize(2 * self._n_buckets)
+
+    def _insert(self, ev, vb):
+        bucket = self._buckets[vb % self._n_buckets]
+
+        # Buckets are kept sorted in descending order to pop from the tail
+        i = len(bucket)
+        while i > 0 and bucket[i - 1] < ev:
+            i -= 1
+        bucket.insert(i, ev)
+
+    def _pop(self):
+        ev = self._find().pop()
+
+        if self._n_events < self._shrink_at and \
+                self._n_buckets > self.MIN_BUCKETS:
+            self._resize(self._n_buckets // 2)
+
+        return ev
+
+    def _peek(self):
+        return self._find()[-1]
+
+    def _compact(self):
+        self._rebuild(self._n_buckets)
+
+    def _find(self):
+        # Scan one year of buckets starting from the current one
+        for vb in range(self._current, self._current + self._n_buckets):
+            bucket = self._buckets[vb % self._n_buckets]
+
+            if bucket and self._virtual_bucket(bucket[-1].time) <= vb:
+                self._current = vb
+                return bucket
+
+        # No event within a year, so jump directly to the earliest event
+        bucket = min((b for b in self._buckets if b), key=lambda b: b[-1])
+        self._current = self._virtual_bucket(bucket[-1].time)
+
+        return bucket
+
+    # Tombstones are dropped on resizing as well, so the counters have to be
+    # updated unlike on compaction
+    def _resize(self, n_buckets):
+        n_dropped = self._rebuild(n_buckets)
+
+        self._n_events -= n_dropped
+        self._n_cancelled -= n_dropped
+
+    # Redistribute the live events into n_buckets buckets, returning the
+    # number of tombstones dropped
+    def _rebuild(self, n_buckets):
+        stored = [ev for bucket in self._buckets for ev in bucket]
+        events = [ev for ev in stored if not ev.cancelled]
+        events.sort()
+
+        self._init(n_buckets, self._estimate_width(events))
+
+        for ev in events:
+            self._insert(ev, self._virtual_bucket(ev.time))
+
+        if events:
+            self._current = self._virtual_bucket(events[0].time)
+
+        return len(stored) - len(events)
+
+    def _estimate_width(self, events):
+        # Use three times the average separation of the earliest events
+        samples = events[:self.N_SAMPLES]
+        gaps = [b.time - a.time for a, b in zip(samples, samples[1:])
+                if b.time > a.time]
+
+        if not gaps:
+            return self._width
+
+        return 3.0 * sum(gaps) / len(gaps)
+
+
+class _Rung:
+    def __init__(self, start, width, n_buckets):
+        self.start = start
+        self.width = width
+        self.buckets = [[] for _ in range(n_buckets)]
+        # Index of the next bucket to consume
+        self.current = 0
+
+    @property
+    def current_start(self):
+        return self.start + self.current * self.width
+
+    def insert(self, ev):
+        i = int((ev.time - self.start) / self.width)
+        i = min(max(i, self.current), len(self.buckets) - 1)
+        self.buckets[i].append(ev)
+
+
+class LadderQueue(EventQueue):
+    # c.f. W. T. Tang, R. S. M. Goh, and I. L.-J. Thng, "Ladder Queue: An
+    # O(1) Priority Queue Structure for Large-Scale Discrete Event
+    # Simulation," ACM Trans. Model. Comput. Simul., vol. 15, no. 3,
+    # pp. 175-204, 2005.
+
+    THRESHOLD = 50
+    MAX_RUNGS = 8
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # Unsorted events later than _top_start
+        self._top = []
+        self._top_start = -inf
+        self._top_min = inf
+        self._top_max = -inf
+        # Buckets of increasingly finer width
+        self._rungs = []
+        # Heap of the earliest events
+        self._bottom = []
+
+    def _push(self, ev):
+        if ev.time > self._top_start:
+            self._top.append(ev)
+            self._top_min = min(self._top_min, ev.time)
+            self._top_max = max(self._top_max, ev.time)
+            return
+
+        for rung in self._rungs:
+            if ev.time >= rung.current_start:
+                rung.insert(ev)
+                return
+
+        heappush(self._bottom, ev)
+
+    def _pop(self):
+        if not self._bottom:
+            self._refill()
+
+        return heappop(self._bottom)
+
+    def _peek(self):
+        if not self._bottom:
+            self._refill()
+
+        return self._bottom[0]
+
+    def _compact(self):
+        self._top = [ev for ev in self._top if not ev.cancelled]
+
+        for rung in self._rungs:
+            for i in range(rung.current, len(rung.buckets)):
+                rung.buckets[i] = [ev for ev in rung.buckets[i]
+                                   if not ev.cancelled]
+
+        self._bottom = [ev for ev in self._bottom if not ev.cancelled]
+        heapify(self._bottom)
+
+    def _refill(self):
+        while not self._bottom:
+            if not self._rungs:
+                self._transfer_top()
+                continue
+
+            rung = self._rungs[-1]
+            while rung.current < len(rung.buckets) and \
+                    not rung.buckets[rung.current]:
+                rung.current += 1
+
+            if rung.current == len(rung.buckets):
+                self._rungs.pop()
+                continue
+
+            bucket = rung.buckets[rung.current]
+            rung.buckets[rung.current] = []
+            rung.current += 1
+
+            # The last bucket also holds events beyond the range of the rung,
+            # so an exhausted rung must not accept any more events
+            if rung.current == len(rung.buckets):
+                self._rungs.pop()
+
+            lo = min(ev.time for ev in bucket)
+            hi = max(ev.time for ev in bucket)
+
+            if len(bucket) > self.THRESHOLD and hi > lo and \
+                    len(self._rungs) < self.MAX_RUNGS:
+                self._spawn(bucket, lo, hi)
+            else:
+                heapify(bucket)
+                self._bottom = bucket
+
+    def _transfer_top(self):
+        top = self._top
+        self._top = []
+        self._top_start = self._top_max
+
+        if len(top) > self.THRESHOLD and self._top_max > self._top_min:
+            self._spawn(top, self._top_min, self._top_max)
+        else:
+            heapify(top)
+            self._bottom = top
+
+        self._top_min = inf
+        self._top_max = -inf
+
+    def _spawn(self, events, lo, hi):
+        rung = _Rung(lo, (hi - lo) / len(events), len(events) + 1)
+
+        for ev in events:
+            rung.insert(ev)
+
+        self._rungs.append(rung)
@@ -0,0 +1,207 @@
+import networkx as nx
+
+import numpy as np
+
+
+# Interconnect topology with nodes interned as integers and directed links
+# stored in CSR form. Links are numbered by their position in the CSR arrays,
+# i.e. grouped by source node in node order and in insertion order within a
+# node, the same order networkx gives for a DiGraph. Node attributes are kept
+# as columns (lists holding None where a node lacks the attribute) and link
+# attributes as arrays, or lists if they are not all numbers.
+class Fabric:
+    def __init__(self, nodes, indptr, indices, node_attrs=None,
+                 edge_attrs=None, attrs=None):
+        self.nodes = list(nodes)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+
+        self.indptr = np.asarray(indptr, np.int64)
+        self.indices = np.asarray(indices, np.int64)
+        # Source node of each link
+        self.sources = np.repeat(np.arange(len(self.nodes)),
+                                 np.diff(self.indptr))
+
+        self.node_attrs = {} if node_attrs is None else node_attrs
+        self.edge_attrs = {} if edge_attrs is None else edge_attrs
+        # Attributes of the whole topology, as networkx graph.graph
+        self.graph = {} if attrs is None else attrs
+
+        # Sorted source * n + target keys of the links for edge_ids()
+        self._keys = None
+        self._order = None
+
+    # Build from links given in insertion order as arrays of node indices.
+    # Duplicated links are dropped, keeping the attributes of the first one.
+    @classmethod
+    def from_edges(cls, nodes, sources, targets, node_attrs=None,
+                   edge_attrs=None, attrs=None):
+        n = len(nodes)
+        sources = np.asarray(sources, np.int64)
+        targets = np.asarray(targets, np.int64)
+
+        # Group the links by source, keeping the insertion order
+        _, first = np.unique(sources * n + targets, return_index=True)
+        first.sort()
+        order = first[np.argsort(sources[first], kind="mergesort")]
+
+        indptr = np.zeros(n + 1, np.int64)
+        indptr[1:] = np.cumsum(np.bincount(sources[order], minlength=n))
+
+        edge_attrs = {key: _take(column, order)
+                      for key, column in (edge_attrs or {}).items()}
+
+        return cls(nodes, indptr, targets[order], node_attrs, edge_attrs,
+                   attrs)
+
+    @classmethod
+    def from_networkx(cls, graph):
+        nodes = graph.nodes()
+        index = {node: i for i, node in enumerate(nodes)}
+        adj = graph.adj
+
+        indptr = np.zeros(len(nodes) + 1, np.int64)
+        indptr[1:] = np.cumsum([len(adj[u]) for u in nodes])
+        indices = np.fromiter((index[v] for u in nodes for v in adj[u]),
+                              np.int64, indptr[-1])
+
+        node_attrs = _columns([graph.node[u] for u in nodes])
+        edge_attrs = _columns([attrs for u in nodes
+                               for attrs in adj[u].values()])
+        for key, column in edge_attrs.items():
+            edge_attrs[key] = _as_array(column)
+
+        return cls(nodes, indptr, indices, node_attrs, edge_attrs,
+                   dict(graph.graph))
+
+    def to_networkx(self):
+        graph = nx.DiGraph(**self.graph)
+        graph.add_nodes_from(self.node_data())
+
+        nodes = self.nodes
+        edge_data = [self._rows(self.edge_attrs, i)
+                     for i in range(self.n_edges)]
+        graph.add_edges_from(
+            (nodes[u], nodes[v], attrs) for u, v, attrs
+            in zip(self.sources.tolist(), self.indices.tolist(), edge_data))
+
+        return graph
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, node):
+        return node in self.index
+
+    @property
+    def n_edges(self):
+        return len(self.indices)
+
+    @property
+    def name(self):
+        return self.graph.get("name", "")
+
+    @staticmethod
+    def _rows(columns, i):
+        attrs = {}
+        for key, column in columns.items():
+            value = column[i]
+            if value is not None:
+                attrs[key] = value.item() if hasattr(value, "item") \
+                    else value
+
+        return attrs
+
+    # Attributes of the given node as a dict
+    def node_data(self, node=None):
+        if node is not None:
+            return self._rows(self.node_attrs, self.index[node])
+
+        return ((node, self._rows(self.node_attrs, i))
+                for i, node in enumerate(self.nodes))
+
+    def column(self, key):
+        return self.node_attrs.get(key, [None] * len(self.nodes))
+
+    # Values of a link attribute, with default for links lacking it
+    def edge_column(self, key, default=None):
+        column = self.edge_attrs.get(key)
+        if column is None:
+            return np.full(self.n_edges, default)
+        elif isinstance(column, np.ndarray):
+            return column
+
+        return np.array([default if value is None else value
+                         for value in column])
+
+    def edges(self):
+        nodes = self.nodes
+
+        return [(nodes[u], nodes[v]) for u, v
+                in zip(self.sources.tolist(), self.indices.tolist())]
+
+    def successors(self, node):
+        u = self.index[node]
+
+        return [self.nodes[v]
+                for v in self.indices[self.indptr[u]:self.indptr[u + 1]]]
+
+    # Build the lookup of links by their end nodes, done on first use
+    def index_edges(self):
+        if self._keys is None:
+            keys = self.sources * len(self.nodes) + self.indices
+            self._order = np.argsort(keys, kind="mergesort")
+            self._keys = keys[self._order]
+
+    # Link ids of the links from us to vs, given as arrays of node indices
+    def edge_ids(self, us, vs):
+        self.index_edges()
+
+        keys = np.asarray(us, np.int64) * len(self.nodes) + \
+            np.asarray(vs, np.int64)
+        positions = np.searchsorted(self._keys, keys)
+
+        if (positions >= len(self._keys)).any() or \
+                (self._keys[positions] != keys).any():
+            raise KeyError("No such link")
+
+        return self._order[positions]
+
+    def edge_id(self, u, v):
+        return self.edge_ids([self.index[u]], [self.index[v]])[0].item()
+
+
+def _columns(items):
+    columns = {}
+
+    for i, attrs in enumerate(items):
+        for key, value in attrs.items():
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = [None] * len(items)
+
+            column[i] = value
+
+    return columns
+
+
+def _as_array(column):
+    if all(isinstance(value, (int, float)) and not isinstance(value, bool)
+           for value in column):
+        return np.array(column)
+
+    return column
+
+
+def _take(column, order):
+    if isinstance(column, np.ndarray):
+        return column[order]
+
+    return [column[i] for i in order.tolist()]
+
+
+# Accept networkx graphs where a fabric is expected
+def as_fabric(graph):
+    if isinstance(graph, Fabric):
+        return graph
+
+    return Fabric.from_networkx(graph)
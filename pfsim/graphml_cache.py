@@ -0,0 +1,184 @@
+import hashlib
+import json
+from logging import getLogger
+from os import getpid, replace
+from pathlib import Path
+
+import networkx as nx
+
+import numpy as np
+
+from .fabric import Fabric
+
+logger = getLogger(__name__)
+
+# Bumped whenever the layout of the compiled files changes
+VERSION = 1
+
+_DTYPES = {"int": np.int64, "float": np.float64, "bool": np.bool_}
+
+
+# GraphML files are compiled into a sidecar .npz file holding the fabric built
+# from them: the node table, the adjacency in CSR form and every node and edge
+# attribute (capacity, dpid, mac, port, ...) as a typed column. The compiled
+# file is used as long as the digest of the GraphML file matches.
+def cache_path(path):
+    return Path(str(path) + ".npz")
+
+
+def file_digest(path):
+    h = hashlib.sha1(str(VERSION).encode())
+
+    with open(str(path), "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+
+    return h.hexdigest()
+
+
+def _kind(values):
+    types = {type(value) for value in values}
+
+    if types == {bool}:
+        return "bool"
+    elif types == {int}:
+        if all(-2 ** 63 <= value < 2 ** 63 for value in values):
+            return "int"
+    elif types <= {int, float}:
+        return "float"
+    elif types == {str}:
+        return "str"
+
+    return "json"
+
+
+def _columns(prefix, columns, arrays):
+    schema = []
+
+    for i, (key, column) in enumerate(columns.items()):
+        mask = np.array([value is not None for value in column], np.bool_)
+        kind = _kind([value.item() if hasattr(value, "item") else value
+                      for value in column if value is not None])
+
+        if kind == "str":
+            array = np.array(["" if value is None else value
+                              for value in column], np.str_)
+        elif kind == "json":
+            array = np.array([json.dumps(value) for value in column],
+                             np.str_)
+        else:
+            array = np.array([0 if value is None else value
+                              for value in column], _DTYPES[kind])
+
+        arrays["{0}_{1}".format(prefix, i)] = array
+        arrays["{0}_mask_{1}".format(prefix, i)] = mask
+        schema.append([key, kind])
+
+    return schema
+
+
+def _read_columns(prefix, schema, data, arrays=False):
+    columns = {}
+
+    for i, (key, kind) in enumerate(schema):
+        column = data["{0}_{1}".format(prefix, i)]
+        mask = data["{0}_mask_{1}".format(prefix, i)]
+
+        # Numeric link attributes stay as arrays if no link lacks them
+        if arrays and kind in _DTYPES and mask.all():
+            columns[key] = column
+            continue
+
+        column = column.tolist()
+        if kind == "json":
+            column = [json.loads(value) for value in column]
+
+        columns[key] = [value if present else None
+                        for value, present in zip(column, mask.tolist())]
+
+    return columns
+
+
+def compile_graphml(path, fabric=None):
+    if fabric is None:
+        fabric = read_graphml(path)
+
+    nodes = fabric.nodes
+
+    # read_graphml() gives string ids, other node types are kept as JSON
+    json_nodes = not all(isinstance(node, str) for node in nodes)
+    if json_nodes:
+        names = [json.dumps(node) for node in nodes]
+    else:
+        names = nodes
+
+    arrays = {
+        "nodes": np.array(names, np.str_),
+        "indptr": fabric.indptr,
+        "indices": fabric.indices
+    }
+
+    schema = {
+        "version": VERSION,
+        "digest": file_digest(path),
+        "json_nodes": json_nodes,
+        "graph": fabric.graph,
+        "node": _columns("node", fabric.node_attrs, arrays),
+        "edge": _columns("edge", fabric.edge_attrs, arrays)
+    }
+    arrays["schema"] = np.array(json.dumps(schema))
+
+    # Write to a temporary file first as several workers may compile the
+    # same topology at once
+    out_path = cache_path(path)
+    tmp_path = Path("{0}.{1}.tmp".format(out_path, getpid()))
+
+    with open(str(tmp_path), "wb") as f:
+        np.savez(f, **arrays)
+
+    replace(str(tmp_path), str(out_path))
+
+    return fabric
+
+
+def load_compiled(path):
+    compiled = cache_path(path)
+    if not compiled.exists():
+        return None
+
+    with np.load(str(compiled)) as data:
+        schema = json.loads(data["schema"].item())
+
+        if schema["version"] != VERSION or \
+                schema["digest"] != file_digest(path):
+            return None
+
+        nodes = data["nodes"].tolist()
+        if schema["json_nodes"]:
+            nodes = [json.loads(node) for node in nodes]
+
+        return Fabric(nodes, data["indptr"], data["indices"],
+                      _read_columns("node", schema["node"], data),
+                      _read_columns("edge", schema["edge"], data, True),
+                      schema["graph"])
+
+
+def read_graphml(path):
+    return Fabric.from_networkx(nx.read_graphml(str(path)))
+
+
+# Read a GraphML file through its compiled form, compiling it if necessary
+def load_graphml(path):
+    fabric = load_compiled(path)
+    if fabric is not None:
+        return fabric
+
+    fabric = read_graphml(path)
+
+    try:
+        compile_graphml(path, fabric)
+    except OSError as e:
+        logger.warning("Could not write compiled topology for %s: %s",
+                       path, e)
+
+    return fabric
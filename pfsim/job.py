@@ -1,18 +1,20 @@
-from collections import defaultdict
 from enum import Enum
 from pathlib import Path
 
+import numpy as np
+
 from .traffic_matrix import TrafficMatrix
 
 
 JobStatus = Enum("JobStatus", "CREATED QUEUED RUNNING FINISHED")
+inf = float("inf")
 
 
 class Job:
     _serial = 0
 
     def __init__(self, name, n_procs=1, duration=0.0, traffic_matrix=None,
-                 generator=None, simulator=None):
+                 generator=None, simulator=None, trace=None):
         self.simulator = simulator
         self.name = name
         self.n_procs = n_procs
@@ -20,12 +22,18 @@ class Job:
         if traffic_matrix is None:
             traffic_matrix = TrafficMatrix(n_procs)
         self.traffic_matrix = traffic_matrix
-        self.link_usage = defaultdict(lambda: 0)
-        self.link_flows = defaultdict(lambda: 0)
+        # Path of the trace the traffic matrix was loaded from, if any
+        self.trace = trace
+        # Links used by this job, and its traffic and flows on each of them
+        self.link_ids = np.empty(0, np.int64)
+        self.link_usage = np.empty(0, np.float64)
+        self.link_flows = np.empty(0, np.int64)
         self.generator = generator
 
         self.hosts = []
         self.procs = []
+        # Index in hosts of the host each rank is mapped to
+        self.rank_hosts = None
 
         self.created_at = None
         self.started_at = None
@@ -34,26 +42,40 @@ class Job:
 
         if simulator:
             self.simulator = simulator
-            self.simulator.register("job.submitted", self._submitted)
-            self.simulator.register("job.started", self._started)
-            self.simulator.register("job.finished", self._finished)
+            self.simulator.subscribe("job.submitted", self._submitted,
+                                     entity=self)
+            self.simulator.subscribe("job.started", self._started,
+                                     entity=self)
+            self.simulator.subscribe("job.finished", self._finished,
+                                     entity=self)
+            # Runs after everyone else has seen this job finish
+            self.simulator.subscribe("job.finished", self._release,
+                                     prio=-inf, entity=self)
 
     def _submitted(self, job):
-        if self != job:
-            return
-
         self.created_at = self.simulator.time
 
     def _finished(self, job):
-        if self != job:
-            return
-
         self.finished_at = self.simulator.time
 
-    def _started(self, job):
-        if self != job:
-            return
+    def _release(self, job):
+        # Drop the state only needed while running, so that finished jobs
+        # kept around (e.g. by metric collectors) do not pin it in memory
+        for proc in self.procs:
+            proc.host = None
+            proc.job = None
 
+        self.hosts = []
+        self.procs = []
+        self.rank_hosts = None
+        self.link_ids = np.empty(0, np.int64)
+        self.link_usage = np.empty(0, np.float64)
+        self.link_flows = np.empty(0, np.int64)
+
+        # This job will not receive any more events
+        self.simulator.release(self)
+
+    def _started(self, job):
         self.started_at = self.simulator.time
 
     def __repr__(self):  # pragma: no cover
@@ -61,11 +83,13 @@ class Job:
                                              self.status.name)
 
     @classmethod
-    def from_trace(cls, path, duration=0.0, generator=None, simulator=None):
+    def from_trace(cls, path, duration=0.0, generator=None, simulator=None,
+                   workers=None):
         with open(str(path), "rb") as f:
-            matrix = TrafficMatrix.load(f)
+            matrix = TrafficMatrix.load(f, workers)
         n_procs = matrix.n_procs
         name = "{0}-{1}".format(Path(path).name, cls._serial)
         cls._serial += 1
 
-        return cls(name, n_procs, duration, matrix, generator, simulator)
+        return cls(name, n_procs, duration, matrix, generator, simulator,
+                   str(path))
@@ -2,22 +2,25 @@ from .job import Job
 
 
 class JobGenerator:
-    def __init__(self, submit, duration, trace, hosts, simulator):
+    def __init__(self, submit, duration, trace, hosts, simulator,
+                 workers=None):
         self.submit_dist = submit
         self.duration_dist = duration
         self.trace = trace
         self.hosts = hosts
         self.simulator = simulator
+        # Number of processes parsing the trace
+        self.workers = workers
 
-        self.simulator.register("simulator.started", self._submit_job)
-        self.simulator.register("job.submitted", self._submit_job)
+        self.simulator.subscribe("simulator.started", self._submit_job)
 
     def _submit_job(self, job=None, **kwargs):
-        if job and job.generator != self:
-            return
-
         job = Job.from_trace(self.trace, self.duration_dist.get(),
-                             generator=self, simulator=self.simulator)
+                             generator=self, simulator=self.simulator,
+                             workers=self.workers)
+        # Submit the next job once this one has been submitted
+        self.simulator.subscribe("job.submitted", self._submit_job,
+                                 entity=job)
 
         self.simulator.schedule_after("job.submitted", self.submit_dist.get(),
                                       job=job)
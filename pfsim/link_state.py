@@ -0,0 +1,67 @@
+from logging import getLogger
+
+import numpy as np
+
+from .fabric import as_fabric
+
+logger = getLogger(__name__)
+
+
+# Load of every directed link of the interconnect. Each link is identified by
+# its id in the fabric, which indexes the arrays.
+class LinkState:
+    def __init__(self, graph, hosts=()):
+        self.fabric = fabric = as_fabric(graph)
+
+        self.traffic = fabric.edge_column("traffic", 0).astype(np.float64)
+        self.flows = fabric.edge_column("flows", 0).astype(np.int64)
+        self.capacity = fabric.edge_column("capacity", 1).astype(np.float64)
+
+        # Links of the network itself, i.e. all but the links between a host
+        # and a switch. These are the links between switches in an indirect
+        # network, and every link in a direct one such as a torus.
+        is_host = np.array([node in hosts for node in fabric.nodes],
+                           np.bool_)
+        self.network = is_host[fabric.sources] == is_host[fabric.indices]
+        self.network_links = np.flatnonzero(self.network)
+
+    def __len__(self):
+        return self.fabric.n_edges
+
+    # End nodes of a link
+    def edge(self, link_id):
+        fabric = self.fabric
+
+        return (fabric.nodes[fabric.sources[link_id]],
+                fabric.nodes[fabric.indices[link_id]])
+
+    def edge_id(self, u, v):
+        return self.fabric.edge_id(u, v)
+
+    # Convert a path given as a list of nodes into an array of link ids
+    def path_edges(self, path):
+        if len(path) < 2:
+            return np.zeros(0, np.int64)
+
+        index = self.fabric.index
+        nodes = np.fromiter((index[u] for u in path), np.int64, len(path))
+
+        return self.fabric.edge_ids(nodes[:-1], nodes[1:])
+
+    # Convert paths of the same length into a matrix of link ids, each row
+    # holding one path
+    def paths_edges(self, paths):
+        index = self.fabric.index
+        nodes = np.array([[index[u] for u in path] for path in paths],
+                         np.int64)
+
+        return self.fabric.edge_ids(nodes[:, :-1], nodes[:, 1:])
+
+    # Add traffic and flows to the given links, which must be unique
+    def add(self, link_ids, traffic, flows):
+        self.traffic[link_ids] += traffic
+        self.flows[link_ids] += flows
+
+    def remove(self, link_ids, traffic, flows):
+        self.traffic[link_ids] -= traffic
+        self.flows[link_ids] -= flows
@@ -0,0 +1,74 @@
+import csv
+from time import perf_counter
+
+from prettytable import PrettyTable
+
+
+def _handler_name(handler):
+    name = getattr(handler, "__qualname__", None)
+    if name is None:
+        return repr(handler)
+
+    return "{0}.{1}".format(handler.__module__, name)
+
+
+class HandlerStats:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, elapsed):
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+
+class Profiler:
+    def __init__(self):
+        # Wall time statistics keyed by event name and handler function, so
+        # that the handlers of all instances of a class are aggregated
+        self.stats = {}
+
+    def dispatch(self, ev, handlers):
+        for _, _, handler in handlers:
+            start = perf_counter()
+            handler(**ev.data)
+            elapsed = perf_counter() - start
+
+            key = (ev.name, getattr(handler, "__func__", handler))
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = HandlerStats()
+
+            stats.add(elapsed)
+
+    def _rows(self):
+        rows = [(event, _handler_name(handler), s.count, s.total,
+                 s.total / s.count, s.max)
+                for (event, handler), s in self.stats.items()]
+        rows.sort(key=lambda row: row[3], reverse=True)
+
+        return rows
+
+    def report(self, f):  # pragma: no cover
+        table = PrettyTable()
+        table.field_names = ["Event", "Handler", "Calls", "Total [s]",
+                             "Mean [s]", "Max [s]"]
+        table.align = "l"
+
+        for event, handler, count, total, mean, max_ in self._rows():
+            table.add_row([event, handler, count, "{0:.6f}".format(total),
+                           "{0:.6f}".format(mean), "{0:.6f}".format(max_)])
+
+        f.write("Handler Profile\n")
+        f.write(str(table))
+        f.write("\n")
+
+    def write_csv(self, f):
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["Event", "Handler", "Calls", "Total", "Mean", "Max"])
+        writer.writerows(self._rows())
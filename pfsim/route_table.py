@@ -0,0 +1,147 @@
+import hashlib
+from logging import getLogger
+from os import getpid, makedirs, replace
+from pathlib import Path
+
+import numpy as np
+
+logger = getLogger(__name__)
+
+
+# Routes between pairs of nodes stored in a single file which is memory-mapped
+# when loaded. Nodes are given by their positions in the fabric and a pair
+# (src, dst) by the key src * n_nodes + dst. The file holds a header followed
+# by the sorted keys, the offsets of each route and the concatenated routes.
+class RouteTable:
+    MAGIC = b"PFRT"
+    VERSION = 1
+
+    HEADER = np.dtype([
+        ("magic", "S4"),
+        ("version", "<u4"),
+        ("n_routes", "<i8"),
+        ("n_nodes", "<i8")
+    ])
+
+    def __init__(self, keys=None, offsets=None, nodes=None):
+        if keys is None:
+            keys = np.zeros(0, np.int64)
+            offsets = np.zeros(1, np.int64)
+            nodes = np.zeros(0, np.int32)
+
+        self.keys = keys
+        self.offsets = offsets
+        self.nodes = nodes
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return self._find(key) is not None
+
+    def _find(self, key):
+        i = np.searchsorted(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return i
+
+        return None
+
+    def get(self, key):
+        i = self._find(key)
+        if i is None:
+            return None
+
+        return self.nodes[self.offsets[i]:self.offsets[i + 1]]
+
+    def items(self):
+        for i, key in enumerate(self.keys.tolist()):
+            yield key, self.nodes[self.offsets[i]:self.offsets[i + 1]]
+
+    # New table holding the routes of this table and the given ones, a dict
+    # from keys to lists of nodes, which take precedence
+    def merge(self, routes):
+        merged = dict(self.items())
+        merged.update(routes)
+
+        keys = np.array(sorted(merged), np.int64)
+        lengths = [len(merged[key]) for key in keys.tolist()]
+
+        offsets = np.zeros(len(keys) + 1, np.int64)
+        offsets[1:] = np.cumsum(lengths)
+        nodes = np.zeros(offsets[-1], np.int32)
+        for key, start, end in zip(keys.tolist(), offsets[:-1], offsets[1:]):
+            nodes[start:end] = merged[key]
+
+        return RouteTable(keys, offsets, nodes)
+
+    @classmethod
+    def load(cls, path):
+        path = Path(path)
+        if not path.exists():
+            return cls()
+
+        header = np.fromfile(str(path), cls.HEADER, 1)
+        if len(header) != 1 or header["magic"][0] != cls.MAGIC or \
+                header["version"][0] != cls.VERSION:
+            logger.warning("Ignoring incompatible route table %s", path)
+            return cls()
+
+        n_routes = int(header["n_routes"][0])
+        n_nodes = int(header["n_nodes"][0])
+        offset = cls.HEADER.itemsize
+
+        keys = np.memmap(str(path), np.int64, "r", offset, (n_routes,))
+        offset += keys.nbytes
+        offsets = np.memmap(str(path), np.int64, "r", offset, (n_routes + 1,))
+        offset += offsets.nbytes
+
+        # np.memmap cannot map an empty array
+        if n_nodes:
+            nodes = np.memmap(str(path), np.int32, "r", offset, (n_nodes,))
+        else:
+            nodes = np.zeros(0, np.int32)
+
+        return cls(keys, offsets, nodes)
+
+    def save(self, path):
+        path = Path(path)
+        makedirs(str(path.parent), exist_ok=True)
+
+        header = np.zeros(1, self.HEADER)
+        header["magic"] = self.MAGIC
+        header["version"] = self.VERSION
+        header["n_routes"] = len(self.keys)
+        header["n_nodes"] = len(self.nodes)
+
+        # Write to a temporary file first so that concurrent readers never see
+        # a partial table
+        tmp_path = Path("{0}.{1}.tmp".format(path, getpid()))
+
+        with open(str(tmp_path), "wb") as f:
+            for array in [header, np.asarray(self.keys, np.int64),
+                          np.asarray(self.offsets, np.int64),
+                          np.asarray(self.nodes, np.int32)]:
+                f.write(array.tobytes())
+
+        replace(str(tmp_path), str(path))
+
+    # Content hash identifying the routes computed by a router
+    @classmethod
+    def digest(cls, fabric, *args):
+        h = hashlib.sha1()
+
+        for item in [cls.VERSION, fabric.graph, fabric.nodes,
+                     sorted(fabric.node_attrs.items())] + list(args):
+            h.update(repr(item).encode())
+
+        for array in [fabric.indptr, fabric.indices]:
+            h.update(np.ascontiguousarray(array, np.int64).tobytes())
+
+        for key, column in sorted(fabric.edge_attrs.items()):
+            h.update(repr(key).encode())
+            if isinstance(column, np.ndarray):
+                h.update(column.tobytes())
+            else:
+                h.update(repr(column).encode())
+
+        return h.hexdigest()
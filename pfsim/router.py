@@ -1,10 +1,20 @@
 import random
 from abc import ABC, abstractmethod
 from collections import defaultdict
+from functools import reduce
 from logging import getLogger
+from operator import mul
+from pathlib import Path
 
 import networkx as nx
 
+import numpy as np
+
+from .fabric import as_fabric
+from .link_state import LinkState
+from .route_table import RouteTable
+from .shortest_paths import ShortestPaths
+
 logger = getLogger(__name__)
 inf = float("inf")
 
@@ -27,119 +37,457 @@ class PathCache:
         return self._cache.get((src, dst), None)
 
     def remove_job(self, job):
-        if job not in self._jobs:
-            return
+        for src, dst in self._jobs.pop(job, ()):
+            self._cache.pop((src, dst), None)
 
-        for src, dst in self._jobs[job]:
-            if (src, dst) not in self._cache:
-                continue
 
-            del self._cache[(src, dst)]
+# Path cache backed by a route table on disk, shared by every run of a router
+# which always gives the same path for a pair of hosts
+class PersistentPathCache(PathCache):
+    def __init__(self, path, nodes, index):
+        super().__init__()
+        self.path = path
+        self.table = RouteTable.load(path)
+
+        self._nodes = nodes
+        self._index = index
+        # Routes computed in this run, which are yet to be saved
+        self._new = {}
+
+    def _key(self, src, dst):
+        return self._index[src.name] * len(self._nodes) + self._index[dst.name]
+
+    def add(self, src, dst, path, job=None):
+        super().add(src, dst, path, job)
+
+        self._new[self._key(src, dst)] = [self._index[u] for u in path]
+
+    def has(self, src, dst):
+        return self.get(src, dst) is not None
+
+    def get(self, src, dst):
+        path = super().get(src, dst)
+        if path is not None:
+            return path
+
+        route = self.table.get(self._key(src, dst))
+        if route is None:
+            return None
+
+        path = [self._nodes[i] for i in route.tolist()]
+        self._cache[(src, dst)] = path
+
+        return path
+
+    def save(self):
+        if not self._new:
+            return
+
+        # Reload the table to keep the routes saved by other runs meanwhile
+        self.table = RouteTable.load(self.path).merge(self._new)
+        self.table.save(self.path)
+        self._new = {}
 
 
 class Router(ABC):
-    def __init__(self, graph, hosts=None, switches=None, **kwargs):
-        self.graph = graph
+    # Whether a pair of hosts is always given the same path, which can then be
+    # saved in a route cache
+    static = False
+
+    def __init__(self, graph, hosts=None, switches=None, links=None,
+                 paths=None, route_cache=None, **kwargs):
+        self.graph = graph = as_fabric(graph)
         if hosts is None:
             hosts = []
         self.hosts = hosts
         if switches is None:
             switches = []
         self.switches = switches
+        if links is None:
+            links = LinkState(graph, {host.name for host in hosts})
+        self.links = links
+        if paths is None:
+            paths = ShortestPaths(graph)
+        self.paths = paths
 
         self.addrs = {host.name: i for i, host in enumerate(self.hosts)}
 
-        self.cache = PathCache()
+        if route_cache is not None and self.static:
+            digest = RouteTable.digest(graph, type(self).__qualname__,
+                                       [host.name for host in self.hosts],
+                                       *self.fingerprint())
+            self.cache = PersistentPathCache(
+                Path(route_cache) / (digest + ".routes"), self.paths.nodes,
+                self.paths.index)
+        else:
+            self.cache = PathCache()
+
+    # Parameters other than the topology which the paths depend on
+    def fingerprint(self):
+        return []
 
     @abstractmethod
     def route(self, src, dst, job=None):  # pragma: no cover
         pass
 
+    # Route every pair, giving each path as an array of link ids. Paths are
+    # computed lazily so that the caller can update the load of the links
+    # in between, which adaptive routers take into account.
+    def route_many(self, pairs, job=None):
+        for src, dst in pairs:
+            yield self.links.path_edges(self.route(src, dst, job))
+
+    def _cached_edges(self, src, dst):
+        path = self.cache.get(src, dst)
+        if path is None:
+            return None
+
+        return self.links.path_edges(path)
+
 
 class RandomRouter(Router):
+    def __init__(self, graph, seed=None, **kwargs):
+        # Each pair draws from its own generator if seeded, so that its path
+        # does not depend on the order in which pairs are routed
+        self.seed = seed
+
+        super().__init__(graph, **kwargs)
+
+    @property
+    def static(self):
+        return self.seed is not None
+
+    def fingerprint(self):
+        return [self.seed]
+
     def route(self, src, dst, job=None):
         if self.cache.has(src, dst):
             return self.cache.get(src, dst)
 
-        paths = list(nx.all_shortest_paths(self.graph, src.name, dst.name))
-        path = random.choice(paths)
+        rng = random
+        if self.seed is not None:
+            rng = random.Random("{0}:{1}:{2}".format(
+                self.seed, src.name, dst.name))
+
+        path = self.paths.sample_path(src.name, dst.name, rng)
         self.cache.add(src, dst, path)
 
         return path
 
 
 class DmodKRouter(Router):
-    def route(self, src, dst, job=None):
-        if self.cache.has(src, dst):
-            return self.cache.get(src, dst)
+    static = True
+
+    def __init__(self, graph, **kwargs):
+        super().__init__(graph, **kwargs)
+
+        self._spines = None
+        if self.graph.graph.get("topology") == "xgft":
+            self._coords = self.graph.column("coords")
+            self._spines = self._xgft_spines(self.graph)
+
+    # Top switches of every subtree of an XGFT, sorted by their labels. A
+    # subtree at level l is numbered by the digits coords[l:] of its nodes.
+    def _xgft_spines(self, graph):
+        m = graph.graph["m"]
+        spines = [defaultdict(list) for _ in range(graph.graph["h"] + 1)]
+
+        for node, level, coords in zip(graph.nodes, graph.column("level"),
+                                       self._coords):
+            if level > 0:
+                index = self._subtree(m, coords, level)
+                spines[level][index].append(node)
+
+        for subtrees in spines:
+            for nodes in subtrees.values():
+                nodes.sort()
+
+        return spines
+
+    @staticmethod
+    def _subtree(m, coords, level):
+        index = 0
+        for k in range(len(coords) - 1, level - 1, -1):
+            index = index * m[k] + coords[k]
+
+        return index
+
+    # D-mod-K path on an XGFT, computed from the coordinates of the hosts.
+    # The path goes up to the lowest subtree holding both hosts and then down
+    # to dst, taking at each level the top switch given by the destination
+    # address modulo the number of top switches.
+    def _route_xgft(self, src, dst, addr):
+        if src == dst:
+            return [src]
+
+        m = self.graph.graph["m"]
+        s = self._coords[self.graph.index[src]]
+        d = self._coords[self.graph.index[dst]]
+        top = max(k + 1 for k in range(len(s)) if s[k] != d[k])
+
+        # Subtrees holding src and dst from the top level down to level 1
+        up = [self._subtree(m, s, top)]
+        down = [up[0]]
+        for k in range(top - 1, 0, -1):
+            up.append(up[-1] * m[k] + s[k])
+            down.append(down[-1] * m[k] + d[k])
+
+        path = [src]
+        for level, index in zip(range(1, top + 1), reversed(up)):
+            spines = self._spines[level][index]
+            path.append(spines[addr % len(spines)])
+        for level, index in zip(range(top - 1, 0, -1), down[1:]):
+            spines = self._spines[level][index]
+            path.append(spines[addr % len(spines)])
+        path.append(dst)
 
-        paths = list(nx.all_shortest_paths(self.graph, src.name, dst.name))
-        indices = list(range(len(paths)))
+        return path
 
-        for i in range(len(paths[0])):
-            # Path decided
-            if len(indices) == 1:
-                break
+    def route_many(self, pairs, job=None):
+        if self._spines is not None:
+            yield from self._route_many_xgft(pairs)
+            return
 
-            switches = sorted(list({paths[j][i] for j in indices}))
+        nodes = self.paths.nodes
+        index = self.paths.index
+        trees = {}
 
-            # Only single option, skipping to next switch in path
-            if len(switches) == 1:
+        for src, dst in pairs:
+            ids = self._cached_edges(src, dst)
+            if ids is not None:
+                yield ids
                 continue
 
-            switch = switches[self.addrs[dst.name] % len(switches)]
+            tree = trees.get(dst)
+            if tree is None:
+                tree = trees[dst] = self._tree(dst)
+            next_links, next_nodes = tree
+
+            u, t = index[src.name], index[dst.name]
+            ids, path = [], [src.name]
+
+            while u != t:
+                if next_links[u] < 0:
+                    raise nx.NetworkXNoPath()
+
+                ids.append(next_links[u])
+                u = next_nodes[u]
+                path.append(nodes[u])
+
+            self.cache.add(src, dst, path)
+
+            yield np.array(ids, np.int64)
+
+    # The closed form does not depend on the load of the links, so the paths
+    # of all the pairs are turned into link ids with a single lookup
+    def _route_many_xgft(self, pairs):
+        paths = [self.route(src, dst) for src, dst in pairs]
+        if not paths:
+            return
+
+        index = self.graph.index
+        nodes = np.fromiter((index[u] for path in paths for u in path),
+                            np.int64)
+        lengths = np.fromiter(map(len, paths), np.int64, len(paths))
+
+        # Every node but the last one of each path is the tail of a link
+        tails = np.ones(len(nodes), bool)
+        tails[np.cumsum(lengths) - 1] = False
+        ids = self.graph.edge_ids(nodes[tails], nodes[1:][tails[:-1]])
 
-            indices = [j for j in indices if paths[j][i] == switch]
+        yield from np.split(ids, np.cumsum(lengths - 1)[:-1])
+
+    # Next hop of every node towards dst, and the link to it, chosen as in
+    # route() for all nodes at once
+    def _tree(self, dst):
+        paths = self.paths
+        n = len(paths)
+        addr = self.addrs[dst.name]
+        dist = paths.to_dest(paths.index[dst.name]).dist
+        sources, heads = paths.sources, paths.indices
+
+        links = np.flatnonzero((dist[sources] > 0) &
+                               (dist[heads] == dist[sources] - 1))
+        links = links[np.lexsort((paths.label_rank[heads[links]],
+                                  sources[links]))]
+
+        counts = np.bincount(sources[links], minlength=n)
+        starts = np.cumsum(counts) - counts
+        mask = counts > 0
+
+        next_links = np.full(n, -1, np.int64)
+        next_links[mask] = links[starts[mask] + addr % counts[mask]]
+        next_nodes = np.full(n, -1, np.int64)
+        next_nodes[mask] = heads[next_links[mask]]
+
+        return next_links.tolist(), next_nodes.tolist()
+
+    def route(self, src, dst, job=None):
+        if self.cache.has(src, dst):
+            return self.cache.get(src, dst)
+
+        addr = self.addrs[dst.name]
+
+        if self._spines is not None:
+            path = self._route_xgft(src.name, dst.name, addr)
+        else:
+            # Among the next hops towards the destination, choose the one
+            # given by the destination address modulo the number of
+            # candidates
+            path = [src.name]
+
+            while path[-1] != dst.name:
+                hops = self.paths.next_hops(path[-1], dst.name)
+                path.append(hops[addr % len(hops)])
 
-        path = paths[indices.pop()]
         self.cache.add(src, dst, path)
 
         return path
 
 
 class GreedyRouter(Router):
+    # Whether to minimize the maximum traffic along the path rather than the
+    # total traffic
+    bottleneck = False
+
     def route(self, src, dst, job=None):
         if self.cache.has(src, dst):
             return self.cache.get(src, dst)
 
-        paths = list(nx.all_shortest_paths(self.graph, src.name, dst.name))
-        min_path = paths[0]
-        min_cost = inf
+        # Path with the least total (or maximum) traffic, the first one wins
+        # a tie
+        min_path = self.paths.optimal_path(src.name, dst.name,
+                                           self.links.traffic,
+                                           self.bottleneck)
 
-        for path in paths:
-            cost = 0
+        self.cache.add(src, dst, min_path, job)
 
-            for u, v in zip(path[:-1], path[1:]):
-                cost += self.graph[u][v]["traffic"]
+        return min_path
 
-            if cost < min_cost:
-                min_path = path
-                min_cost = cost
+    def route_many(self, pairs, job=None):
+        nodes = self.paths.nodes
+        heads = self.paths.indices
 
-        self.cache.add(src, dst, min_path, job)
+        for src, dst in pairs:
+            ids = self._cached_edges(src, dst)
+            if ids is not None:
+                yield ids
+                continue
+
+            ids = self.paths.optimal_links(src.name, dst.name,
+                                           self.links.traffic,
+                                           self.bottleneck)
+
+            path = [src.name] + [nodes[v] for v in heads[ids].tolist()]
+            self.cache.add(src, dst, path, job)
+
+            yield ids
+
+
+class GreedyRouter2(GreedyRouter):
+    bottleneck = True
 
-        return min_path
 
+# Dimension-order routing on a torus generated by NDTorusTopology. Each
+# dimension is traversed in turn, from the first one, going the shorter way
+# around the ring (the positive direction on a tie).
+class DimensionOrderRouter(Router):
+    static = True
+
+    def __init__(self, graph, **kwargs):
+        super().__init__(graph, **kwargs)
+
+        assert self.graph.graph.get("topology") == "torus"
+
+        self.dims = self.graph.graph["dims"]
+        self._strides = [reduce(mul, self.dims[:k], 1)
+                         for k in range(len(self.dims))]
+
+        # Nodes indexed by their coordinates in mixed radix
+        self._coords = self.graph.column("coords")
+        self._nodes = [None] * reduce(mul, self.dims, 1)
+        for node, coords in zip(self.graph.nodes, self._coords):
+            self._nodes[self._index(coords)] = node
+
+        self._hops = None
+
+    def _index(self, coords):
+        return sum(c * stride for c, stride in zip(coords, self._strides))
+
+    # Link from every node to its neighbor along each dimension, first in the
+    # positive and then in the negative direction, and that neighbor, as
+    # nested lists indexed by node, dimension and direction
+    def _hop_links(self):
+        if self._hops is None:
+            n = len(self.graph.nodes)
+            nodes = np.arange(n)
+            coords = np.array(self._coords, np.int64).reshape(n, -1)
+            strides = np.array(self._strides, np.int64)
+
+            order = np.empty(n, np.int64)
+            order[coords.dot(strides)] = nodes
+
+            links = np.zeros((n, len(self.dims), 2), np.int64)
+            for k, size in enumerate(self.dims):
+                for way, step in enumerate([1, -1]):
+                    moved = coords.copy()
+                    moved[:, k] = (moved[:, k] + step) % size
+                    links[:, k, way] = self.graph.edge_ids(
+                        nodes, order[moved.dot(strides)])
+
+            self._hops = links.tolist(), self.graph.indices[links].tolist()
+
+        return self._hops
 
-class GreedyRouter2(Router):
     def route(self, src, dst, job=None):
         if self.cache.has(src, dst):
             return self.cache.get(src, dst)
 
-        paths = list(nx.all_shortest_paths(self.graph, src.name, dst.name))
-        min_path = paths[0]
-        min_cost = inf
+        s = self._coords[self.graph.index[src.name]]
+        d = self._coords[self.graph.index[dst.name]]
+        index = self._index(s)
+        path = [src.name]
 
-        for path in paths:
-            cost = 0
+        for c, target, size, stride in zip(s, d, self.dims, self._strides):
+            delta = (target - c) % size
+            step = 1 if 2 * delta <= size else -1
 
-            for u, v in zip(path[:-1], path[1:]):
-                cost = max(self.graph[u][v]["traffic"], cost)
+            while c != target:
+                nxt = (c + step) % size
+                index += (nxt - c) * stride
+                c = nxt
+                path.append(self._nodes[index])
 
-            if cost < min_cost:
-                min_path = path
-                min_cost = cost
+        self.cache.add(src, dst, path)
 
-        self.cache.add(src, dst, min_path, job)
+        return path
 
-        return min_path
+    def route_many(self, pairs, job=None):
+        nodes = self.graph.nodes
+        index = self.graph.index
+        links, heads = self._hop_links()
+
+        for src, dst in pairs:
+            ids = self._cached_edges(src, dst)
+            if ids is not None:
+                yield ids
+                continue
+
+            u = index[src.name]
+            d = self._coords[index[dst.name]]
+            ids, path = [], [src.name]
+
+            for k, (c, target, size) in enumerate(zip(self._coords[u], d,
+                                                      self.dims)):
+                delta = (target - c) % size
+                way, hops = (0, delta) if 2 * delta <= size else \
+                    (1, size - delta)
+
+                for _ in range(hops):
+                    ids.append(links[u][k][way])
+                    u = heads[u][k][way]
+                    path.append(nodes[u])
+
+            self.cache.add(src, dst, path)
+
+            yield np.array(ids, np.int64)
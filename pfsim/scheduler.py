@@ -1,6 +1,8 @@
 from collections import deque
 from logging import getLogger
 
+import numpy as np
+
 from .job import JobStatus
 from .process import Process
 
@@ -18,8 +20,8 @@ class FCFSScheduler:
         self.n_running = 0
         self.n_finished = 0
 
-        simulator.register("job.submitted", self._job_submitted)
-        simulator.register("job.finished", self._job_finished)
+        simulator.subscribe("job.submitted", self._job_submitted)
+        simulator.subscribe("job.finished", self._job_finished)
 
     @property
     def n_queued(self):
@@ -91,5 +93,9 @@ class FCFSScheduler:
         for proc in procs:
             proc.job = job
 
+        host_index = {host: i for i, host in enumerate(selected_hosts)}
+        job.rank_hosts = np.fromiter((host_index[proc.host] for proc in procs),
+                                     np.int64, len(procs))
+
         self.simulator.schedule("job.started", job=job)
         self.simulator.schedule_after("job.finished", job.duration, job=job)
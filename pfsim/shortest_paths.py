@@ -0,0 +1,300 @@
+import random
+from collections import OrderedDict
+from logging import getLogger
+
+import networkx as nx
+
+import numpy as np
+
+from .fabric import as_fabric
+
+logger = getLogger(__name__)
+
+
+class _Search:
+    def __init__(self, dist, rank, count):
+        # Hop count from the root, or -1 if unreachable
+        self.dist = dist
+        # Order in which nodes have been discovered
+        self.rank = rank
+        # Number of shortest paths from the root
+        self.count = count
+        # Predecessors of each node on the shortest paths and the ids of the
+        # links from them, filled lazily
+        self.preds = {}
+
+
+# Shortest paths between every pair of nodes of a topology, computed by a
+# breadth-first search per source (or destination) which is cached. Paths are
+# enumerated in the same order as nx.all_shortest_paths() so that routers
+# built on top of this make the same decisions.
+class ShortestPaths:
+    # Number of searches kept in memory for each direction
+    CACHE_SIZE = 256
+
+    def __init__(self, graph):
+        fabric = as_fabric(graph)
+        self.nodes = fabric.nodes
+        self.index = fabric.index
+
+        n = len(self.nodes)
+
+        # Successors in CSR form, the position in indices being the link id
+        self.indptr = fabric.indptr
+        self.indices = fabric.indices
+        # Source node of each link
+        self.sources = fabric.sources
+
+        # Predecessors in CSR form, along with the link id of each entry
+        order = np.argsort(self.indices, kind="mergesort")
+        self.rindptr = np.zeros(n + 1, np.int64)
+        self.rindptr[1:] = np.cumsum(np.bincount(self.indices, minlength=n))
+        self.rindices = self.sources[order]
+        self.rlinks = order
+
+        # Scratch space for the path costs of optimal_path()
+        self._cost = np.full(n, np.inf)
+
+        self._label_rank = None
+        self._from_source = OrderedDict()
+        self._to_dest = OrderedDict()
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _bfs(self, root, indptr, indices):
+        n = len(self.nodes)
+        dist = np.full(n, -1, np.int64)
+        rank = np.full(n, -1, np.int64)
+        count = np.zeros(n, np.int64)
+
+        dist[root] = 0
+        rank[root] = 0
+        count[root] = 1
+        n_seen = 1
+        level = 0
+        frontier = np.array([root], np.int64)
+
+        while len(frontier):
+            level += 1
+
+            # Neighbors of the frontier, in the order they are visited
+            starts = indptr[frontier]
+            lengths = indptr[frontier + 1] - starts
+            offsets = np.cumsum(lengths) - lengths
+            positions = np.repeat(starts - offsets, lengths) + \
+                np.arange(lengths.sum())
+            parents = np.repeat(frontier, lengths)
+            children = indices[positions]
+
+            # Keep the edges leading to unseen nodes, i.e. to the next level
+            mask = dist[children] < 0
+            parents = parents[mask]
+            children = children[mask]
+
+            nodes, first = np.unique(children, return_index=True)
+            frontier = nodes[np.argsort(first, kind="mergesort")]
+
+            dist[frontier] = level
+            rank[frontier] = np.arange(n_seen, n_seen + len(frontier))
+            n_seen += len(frontier)
+            np.add.at(count, children, count[parents])
+
+        return _Search(dist, rank, count)
+
+    def _cached(self, cache, root, indptr, indices):
+        search = cache.get(root)
+        if search is not None:
+            cache.move_to_end(root)
+            return search
+
+        search = self._bfs(root, indptr, indices)
+        cache[root] = search
+
+        if len(cache) > self.CACHE_SIZE:
+            cache.popitem(last=False)
+
+        return search
+
+    def from_source(self, source):
+        return self._cached(self._from_source, source, self.indptr,
+                            self.indices)
+
+    def to_dest(self, dest):
+        return self._cached(self._to_dest, dest, self.rindptr, self.rindices)
+
+    def _preds(self, search, node):
+        preds = search.preds.get(node)
+        if preds is None:
+            lo, hi = self.rindptr[node], self.rindptr[node + 1]
+            nodes, links = self.rindices[lo:hi], self.rlinks[lo:hi]
+
+            mask = search.dist[nodes] == search.dist[node] - 1
+            nodes, links = nodes[mask], links[mask]
+
+            order = np.argsort(search.rank[nodes])
+            preds = (nodes[order].tolist(), links[order].tolist())
+            search.preds[node] = preds
+
+        return preds
+
+    def _search(self, src, dst):
+        s, t = self.index[src], self.index[dst]
+        search = self.from_source(s)
+
+        if search.dist[t] < 0:
+            raise nx.NetworkXNoPath()
+
+        return s, t, search
+
+    def count_paths(self, src, dst):
+        _, t, search = self._search(src, dst)
+
+        return search.count[t].item()
+
+    def distance(self, src, dst):
+        _, t, search = self._search(src, dst)
+
+        return search.dist[t].item()
+
+    def all_paths(self, src, dst):
+        s, t, search = self._search(src, dst)
+        nodes = self.nodes
+
+        if s == t:
+            yield [src]
+            return
+
+        # Depth-first search from the destination back to the source
+        path = [t]
+        stack = [iter(self._preds(search, t)[0])]
+
+        while stack:
+            node = next(stack[-1], None)
+
+            if node is None:
+                stack.pop()
+                path.pop()
+            elif node == s:
+                yield [src] + [nodes[i] for i in reversed(path)]
+            else:
+                path.append(node)
+                stack.append(iter(self._preds(search, node)[0]))
+
+    # Choose a path uniformly at random. Equivalent to random.choice() over
+    # the list of all paths, consuming the same random numbers.
+    def sample_path(self, src, dst, rng=random):
+        s, t, search = self._search(src, dst)
+        count = search.count
+
+        k = rng.randrange(count[t].item())
+        path = [t]
+
+        while path[-1] != s:
+            for pred in self._preds(search, path[-1])[0]:
+                n_paths = count[pred].item()
+                if k < n_paths:
+                    path.append(pred)
+                    break
+
+                k -= n_paths
+
+        return [self.nodes[i] for i in reversed(path)]
+
+    # Find the path minimizing the sum (or the maximum if bottleneck is set)
+    # of the given link weights by dynamic programming over the shortest
+    # paths. Ties go to the path enumerated first by all_paths().
+    def optimal_path(self, src, dst, weights, bottleneck=False):
+        path, _ = self._optimal(src, dst, weights, bottleneck)
+
+        return [self.nodes[i] for i in path]
+
+    # Same as optimal_path() but gives the ids of the links along the path
+    def optimal_links(self, src, dst, weights, bottleneck=False):
+        _, links = self._optimal(src, dst, weights, bottleneck)
+
+        return np.array(links, np.int64)
+
+    def _optimal(self, src, dst, weights, bottleneck):
+        s, t, search = self._search(src, dst)
+        if s == t:
+            return [s], []
+
+        cost = self._cost
+        cost[s] = -np.inf if bottleneck else 0.0
+        visited = [s]
+
+        # Relax the links towards dst one hop at a time
+        dist = self.to_dest(t).dist
+        frontier = np.array([s], np.int64)
+
+        while frontier[0] != t:
+            starts = self.indptr[frontier]
+            lengths = self.indptr[frontier + 1] - starts
+            offsets = np.cumsum(lengths) - lengths
+            links = np.repeat(starts - offsets, lengths) + \
+                np.arange(lengths.sum())
+            parents = np.repeat(frontier, lengths)
+            children = self.indices[links]
+
+            mask = dist[children] == dist[parents] - 1
+            links, parents, children = \
+                links[mask], parents[mask], children[mask]
+
+            if bottleneck:
+                costs = np.maximum(cost[parents], weights[links])
+            else:
+                costs = cost[parents] + weights[links]
+
+            frontier = np.unique(children)
+            visited.append(frontier)
+            np.minimum.at(cost, children, costs)
+
+        # Walk back from dst, taking the first predecessor which achieves the
+        # optimal cost
+        path = [t]
+        path_links = []
+        bound = cost[t]
+
+        while path[-1] != s:
+            node = path[-1]
+            preds, links = self._preds(search, node)
+
+            for pred, link in zip(preds, links):
+                if bottleneck:
+                    if cost[pred] <= bound and weights[link] <= bound:
+                        break
+                elif cost[pred] + weights[link] == cost[node]:
+                    break
+
+            path.append(pred)
+            path_links.append(link)
+
+        for nodes in visited:
+            cost[nodes] = np.inf
+
+        return path[::-1], path_links[::-1]
+
+    # Neighbors of the given node on the shortest paths towards dst, sorted by
+    # their labels
+    def next_hops(self, node, dst):
+        u, t = self.index[node], self.index[dst]
+        dist = self.to_dest(t).dist
+
+        if dist[u] < 0:
+            raise nx.NetworkXNoPath()
+
+        succs = self.indices[self.indptr[u]:self.indptr[u + 1]]
+        succs = succs[dist[succs] == dist[u] - 1]
+        succs = succs[np.argsort(self.label_rank[succs])]
+
+        return [self.nodes[i] for i in succs]
+
+    @property
+    def label_rank(self):
+        if self._label_rank is None:
+            order = sorted(range(len(self.nodes)), key=self.nodes.__getitem__)
+            self._label_rank = np.empty(len(self.nodes), np.int64)
+            self._label_rank[order] = np.arange(len(self.nodes))
+
+        return self._label_rank
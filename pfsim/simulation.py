@@ -1,28 +1,45 @@
+import pickle
+import random
 from importlib import import_module
 from logging import getLogger
-from os import makedirs
+from os import makedirs, replace
 from pathlib import Path
 
 from prettytable import PrettyTable
 
 from .cluster import Cluster
 from .collector import InterconnectMetricsCollector, SchedulerMetricsCollector
+from .job import Job
 from .job_generator import JobGenerator
+from .router import PersistentPathCache
 from .simulator import Simulator
+from .timeline import Timeline, TimelineRecorder, TimelineReplayer
+from .traffic_matrix import TrafficMatrix
 
 logger = getLogger(__name__)
 
 
 class Simulation:
-    def __init__(self, base_path, conf):
+    # Topologies generated by preload(), keyed by the path they are relative
+    # to and their configuration
+    _topologies = {}
+
+    def __init__(self, base_path, conf, timeline=None, record=False):
         # Create simulator
-        self.simulator = Simulator()
+        queue = self._load_class(conf.event_queue)
+        self.simulator = Simulator(queue=queue(), profile=conf.profile)
 
         # Create topology
-        params = conf.topology.params.copy()
-        params["base_path"] = base_path
-        topo = self._load_class(conf.topology.kind)
-        graph = topo(**params).generate()
+        graph = self._topologies.get(self._topology_key(base_path, conf))
+        if graph is None:
+            graph = self._generate_topology(base_path, conf)
+
+        # Static routes can be loaded from and saved to a route cache
+        router_params = {}
+        if conf.route_cache is not None:
+            router_params["route_cache"] = str(base_path / conf.route_cache)
+        if conf.router_seed is not None:
+            router_params["seed"] = conf.router_seed
 
         # Create cluster
         self.cluster = Cluster(
@@ -31,24 +48,38 @@ class Simulation:
             process_mapper=self._load_class(conf.process_mapper),
             scheduler=self._load_class(conf.scheduler),
             router=self._load_class(conf.router),
+            router_params=router_params,
             simulator=self.simulator
         )
 
-        # Create job generators
+        # Create job generators, or replay the jobs of another scenario
         self.job_generators = []
-        for job_conf in conf.jobs:
-            submit_dist = self._load_class(job_conf.submit_dist)
-            duration_dist = self._load_class(job_conf.duration_dist)
-
-            job_gen = JobGenerator(
-                submit=submit_dist(**job_conf.submit_params),
-                duration=duration_dist(**job_conf.duration_params),
-                trace=str(base_path / job_conf.trace),
-                hosts=self.cluster.hosts,
-                simulator=self.simulator
-            )
-
-            self.job_generators.append(job_gen)
+        self.timeline = timeline
+
+        # Trace tarballs can be parsed by several processes
+        if timeline is not None:
+            TimelineReplayer(timeline, self.cluster, self.simulator,
+                             workers=conf.trace_workers)
+        else:
+            for job_conf in conf.jobs:
+                submit_dist = self._load_class(job_conf.submit_dist)
+                duration_dist = self._load_class(job_conf.duration_dist)
+
+                job_gen = JobGenerator(
+                    submit=submit_dist(**job_conf.submit_params),
+                    duration=duration_dist(**job_conf.duration_params),
+                    trace=str(base_path / job_conf.trace),
+                    hosts=self.cluster.hosts,
+                    simulator=self.simulator,
+                    workers=conf.trace_workers
+                )
+
+                self.job_generators.append(job_gen)
+
+            # Record the jobs so that other scenarios can replay them
+            if record:
+                self.timeline = Timeline()
+                TimelineRecorder(self.simulator, self.timeline)
 
         # Create metric collectors
         self.collectors = [
@@ -63,6 +94,10 @@ class Simulation:
 
         self.conf = conf
 
+    @property
+    def checkpoint_path(self):
+        return Path(self.output_path) / "checkpoint.pickle"
+
     def run(self):
         result_path = (Path(self.output_path) / "result.txt")
 
@@ -72,18 +107,115 @@ class Simulation:
             # Print cluster configuration
             self.cluster.report(f)
 
+            interval = self.conf.checkpoint_interval
+            if interval:
+                # Save the state periodically so that the run can be resumed.
+                # The simulated time only advances to the last event, so the
+                # next checkpoint is kept apart from it.
+                checkpoint_at = self.simulator.time + interval
+                while checkpoint_at < self.conf.duration:
+                    self.simulator.run_until(checkpoint_at)
+                    self.checkpoint(self.checkpoint_path)
+                    checkpoint_at += interval
+
             self.simulator.run_until(self.conf.duration)
 
+            cache = self.cluster.router.cache
+            if isinstance(cache, PersistentPathCache):
+                cache.save()
+
             for collector in self.collectors:
                 collector.report(f)
                 collector.write_csvs(self.output_path)
 
+            profiler = self.simulator.profiler
+            if profiler is not None:
+                profiler.report(f)
+
+                with open(str(self.output_path / "profile.csv"), "w",
+                          newline="") as csv_file:
+                    profiler.write_csv(csv_file)
+
+        if self.checkpoint_path.exists():
+            self.checkpoint_path.unlink()
+
+    def checkpoint(self, path):
+        # Write to a temporary file first not to leave a broken checkpoint
+        tmp_path = Path(str(path) + ".tmp")
+
+        with open(str(tmp_path), "wb") as f:
+            pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
+
+        replace(str(tmp_path), str(path))
+
+    @staticmethod
+    def _topology_key(base_path, conf):
+        return (str(base_path), conf.topology.kind,
+                repr(sorted(conf.topology.params.items())))
+
+    @classmethod
+    def _generate_topology(cls, base_path, conf):
+        params = conf.topology.params.copy()
+        params["base_path"] = base_path
+        topo = cls._load_class(conf.topology.kind)
+
+        return topo(**params).generate()
+
+    # Load every distinct topology and trace of the scenarios once, so that
+    # worker processes forked afterwards share them instead of loading their
+    # own copies. A scenario which cannot be preloaded is left to fail in its
+    # worker.
+    @classmethod
+    def preload(cls, base_path, confs):
+        for conf in confs:
+            try:
+                key = cls._topology_key(base_path, conf)
+                if key not in cls._topologies:
+                    fabric = cls._generate_topology(base_path, conf)
+                    fabric.index_edges()
+                    cls._topologies[key] = fabric
+
+                for job_conf in conf.jobs:
+                    TrafficMatrix.preload(str(base_path / job_conf.trace),
+                                          conf.trace_workers)
+
+            except Exception as err:
+                logger.warning("Could not preload scenario #%s: %s",
+                               conf.id, err)
+
+    @classmethod
+    def restore(cls, path, output_path=None):
+        with open(str(path), "rb") as f:
+            sim = pickle.load(f)
+
+        # Forked simulations need their own output directory
+        if output_path is not None:
+            sim.output_path = output_path
+            makedirs(str(sim.output_path), exist_ok=True)
+
+        return sim
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Global states which affect the rest of the simulation
+        state["_random_state"] = random.getstate()
+        state["_job_serial"] = Job._serial
+
+        return state
+
+    def __setstate__(self, state):
+        random.setstate(state.pop("_random_state"))
+        Job._serial = state.pop("_job_serial")
+
+        self.__dict__.update(state)
+
     def report(self, f):  # pragma: no cover
         table = PrettyTable()
         table.field_names = ["Item", "Value"]
         table.align = "l"
 
         table.add_row(["Duration", self.conf.duration])
+        table.add_row(["Event Queue", self.conf.event_queue])
         table.add_row(["Cluster Topology", "{0} {1}".format(
             self.conf.topology.kind, self.conf.topology.params)])
         table.add_row(["Host Section Algorithm", self.conf.host_selector])
@@ -94,7 +226,8 @@ class Simulation:
         f.write(str(table))
         f.write("\n")
 
-    def _load_class(self, path):
+    @staticmethod
+    def _load_class(path):
         mod_name, cls_name = path.rsplit(".", 1)
 
         try:
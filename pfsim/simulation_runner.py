@@ -1,3 +1,4 @@
+from collections import OrderedDict
 from logging import getLogger
 from logging.handlers import QueueHandler
 from multiprocessing import Manager, Pool
@@ -13,12 +14,22 @@ from .simulation import Simulation
 logger = getLogger(__name__)
 
 
-def _run_scenario(path, conf):
+def _run_scenario(path, conf, timeline=None, record=False):
     logger.info("Starting scenario #%d at worker (PID %d)",
                 conf.id, getpid())
 
     try:
-        scenario = Simulation(path, conf)
+        checkpoint_path = path / conf.output / str(conf.id) / \
+            "checkpoint.pickle"
+
+        # Resume from the last checkpoint if a previous run was interrupted
+        if conf.checkpoint_interval and checkpoint_path.exists():
+            logger.info("Resuming scenario #%d from %s", conf.id,
+                        checkpoint_path)
+            scenario = Simulation.restore(checkpoint_path)
+        else:
+            scenario = Simulation(path, conf, timeline, record)
+
         scenario.run()
 
     except Exception as err:
@@ -30,6 +41,24 @@ def _run_scenario(path, conf):
         logger.info("Scenario #%d finished at worker (PID %d)",
                     conf.id, getpid())
 
+        return scenario.timeline
+
+
+def _group_by_timeline(confs):
+    # Scenarios which only differ in the router share the same timeline of
+    # jobs. The first scenario of each group records it for the rest.
+    groups = OrderedDict()
+
+    for conf in confs:
+        if conf.share_timeline:
+            key = repr(conf._replace(id=None, router=None))
+        else:
+            key = conf.id
+
+        groups.setdefault(key, []).append(conf)
+
+    return list(groups.values())
+
 
 def _logger_thread(queue):
     while True:
@@ -69,22 +98,52 @@ class SimulationRunner:
         thread = Thread(target=_logger_thread, args=(log_q,))
         thread.start()
 
+        try:
+            self._run_pool(base_path, degree_parallelism, log_q)
+        finally:
+            # Stop the logger thread even if the run fails, or the process
+            # never exits
+            log_q.put(None)
+            thread.join()
+
+    def _run_pool(self, base_path, degree_parallelism, log_q):
+        groups = _group_by_timeline(self.confs)
+
+        # Workers are forked after the topologies and traces are loaded, so
+        # that they all share a single copy
+        logger.info("Preloading topologies and traces")
+        Simulation.preload(base_path, [conf for group in groups
+                                       for conf in group])
+
         with Pool(degree_parallelism, _set_q_handler, (log_q,)) as pool:
+            # Run the first scenario of each group to record the timelines
+            leaders = []
+            for group in groups:
+                res = pool.apply_async(_run_scenario,
+                                       (base_path, group[0], None,
+                                        len(group) > 1))
+                leaders.append(res)
+
             results = []
-            for conf in self.confs:
-                res = pool.apply_async(_run_scenario, (base_path, conf))
-                results.append(res)
+            for group, leader in zip(groups, leaders):
+                timeline = leader.get()
+
+                for conf in group[1:]:
+                    res = pool.apply_async(_run_scenario,
+                                           (base_path, conf, timeline))
+                    results.append(res)
 
             for res in results:
                 res.get()
 
-        log_q.put(None)
-        thread.join()
-
     def run_serial(self):
         base_path = Path(self.path).parent
         logger.info("Starting simulation in serial mode")
         logger.info("Using scenario file %s", Path(self.path).resolve())
 
-        for conf in self.confs:
-            _run_scenario(base_path, conf)
+        for group in _group_by_timeline(self.confs):
+            timeline = _run_scenario(base_path, group[0],
+                                     record=len(group) > 1)
+
+            for conf in group[1:]:
+                _run_scenario(base_path, conf, timeline)
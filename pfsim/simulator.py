@@ -1,32 +1,58 @@
 from collections import defaultdict
-from heapq import heappop, heappush
+from heapq import merge
 from logging import getLogger
-from operator import itemgetter
+
+from .event_queue import BinaryHeapQueue
+from .profiler import Profiler
 
 logger = getLogger(__name__)
 
 
 class Event:
-    def __init__(self, name, time, data={}):
+    __slots__ = ("name", "time", "seq", "data", "pending", "cancelled")
+
+    def __init__(self, name, time, data={}, seq=0):
         self.name = name
         self.time = time
+        # Sequence number to order events scheduled at the same time
+        self.seq = seq
         self.data = data
+        # Whether this event is waiting in an event queue
+        self.pending = False
+        self.cancelled = False
 
     def __repr__(self):  # pragma: no cover
         return "<Event {0} t:{1} data:{2}>".format(self.name, self.time,
                                                    self.data)
 
     def __lt__(self, other):
+        if self.time == other.time:
+            return self.seq < other.seq
+
         return self.time < other.time
 
 
 class Simulator:
-    def __init__(self):
-        self.event_queue = []
-        self.event_handlers = defaultdict(list)
+    def __init__(self, queue=None, profile=False):
+        if queue is None:
+            queue = BinaryHeapQueue()
+        self.event_queue = queue
+        # Records the wall time spent in each handler if enabled
+        self.profiler = Profiler() if profile else None
+        # Handlers receiving every event of a name
+        self.event_handlers = {}
+        # Handlers receiving only the events which carry a given entity
+        self.entity_handlers = {}
         self.time = 0.0
         self.n_events = 0
 
+        # Event names each entity has subscriptions for
+        self._entity_events = defaultdict(set)
+        # Number of subscriptions made, used to order equal priorities
+        self._n_subscriptions = 0
+        # Number of events scheduled, used to order simultaneous events
+        self._n_scheduled = 0
+
         self.schedule("simulator.started")
 
     def run(self):
@@ -34,34 +60,117 @@ class Simulator:
             self.step()
 
     def run_until(self, time):
-        while self.event_queue and self.event_queue[0][0] <= time:
+        while self.event_queue and self.event_queue.peek().time <= time:
             self.step()
 
     def step(self):
         if not self.event_queue:
             return
 
-        self.time, ev = heappop(self.event_queue)
+        ev = self.event_queue.pop()
+        self.time = ev.time
         self.n_events += 1
 
-        if ev.name not in self.event_handlers:
+        handlers = self.event_handlers.get(ev.name, [])
+        if ev.name in self.entity_handlers:
+            scoped = self._scoped_handlers(ev)
+            if scoped:
+                handlers = merge(handlers, scoped)
+        elif ev.name not in self.event_handlers:
             logger.warning("No handler is registered for {0}".format(ev.name))
 
-        for prio, handler in self.event_handlers[ev.name]:
+        if self.profiler is not None:
+            self.profiler.dispatch(ev, handlers)
+            return
+
+        for _, _, handler in handlers:
             handler(**ev.data)
 
+    def _scoped_handlers(self, ev):
+        by_entity = self.entity_handlers[ev.name]
+        handlers = []
+
+        for value in ev.data.values():
+            try:
+                handlers.extend(by_entity.get(value, []))
+            except TypeError:
+                # Unhashable payloads can never be subscribed to
+                continue
+
+        handlers.sort()
+
+        return handlers
+
     def schedule_after(self, name, time=None, **kwargs):
-        self.schedule(name, self.time + time, **kwargs)
+        return self.schedule(name, self.time + time, **kwargs)
 
     def schedule(self, name, time=None, **kwargs):
         if not time:
             time = self.time
 
-        ev = Event(name, time, kwargs)
-        heappush(self.event_queue, (ev.time, ev))
+        ev = Event(name, time, kwargs, self._n_scheduled)
+        self._n_scheduled += 1
+        self.event_queue.push(ev)
 
-    def register(self, name, handler, prio=0):
-        handlers = self.event_handlers[name]
+        # The event serves as a handle to cancel it later
+        return ev
 
-        handlers.append((prio, handler))
-        handlers.sort(key=itemgetter(0), reverse=True)
+    def cancel(self, ev):
+        # Returns False if the event has already been dispatched or cancelled
+        return self.event_queue.cancel(ev)
+
+    def subscribe(self, name, handler, prio=0, entity=None):
+        # Handlers run in descending order of priority, then in the order
+        # they have subscribed. Lists are replaced rather than mutated so
+        # that handlers can (un)subscribe while an event is dispatched.
+        entry = (-prio, self._n_subscriptions, handler)
+        self._n_subscriptions += 1
+
+        if entity is None:
+            handlers = self.event_handlers.get(name, [])
+            self.event_handlers[name] = sorted(handlers + [entry])
+            return
+
+        by_entity = self.entity_handlers.setdefault(name, {})
+        by_entity[entity] = sorted(by_entity.get(entity, []) + [entry])
+        self._entity_events[entity].add(name)
+
+    def unsubscribe(self, name, handler, entity=None):
+        if entity is None:
+            handlers = [h for h in self.event_handlers.get(name, [])
+                        if h[2] != handler]
+
+            if handlers:
+                self.event_handlers[name] = handlers
+            else:
+                self.event_handlers.pop(name, None)
+            return
+
+        by_entity = self.entity_handlers.get(name, {})
+        handlers = [h for h in by_entity.get(entity, []) if h[2] != handler]
+
+        if handlers:
+            by_entity[entity] = handlers
+            return
+
+        by_entity.pop(entity, None)
+        if not by_entity:
+            self.entity_handlers.pop(name, None)
+
+        names = self._entity_events.get(entity)
+        if names is not None:
+            names.discard(name)
+            if not names:
+                del self._entity_events[entity]
+
+    def release(self, entity):
+        # Drop every subscription scoped to the given entity
+        for name in self._entity_events.pop(entity, ()):
+            by_entity = self.entity_handlers[name]
+            del by_entity[entity]
+
+            if not by_entity:
+                del self.entity_handlers[name]
+
+    def register(self, name, handler, prio=0):
+        self.subscribe(name, handler, prio)
@@ -3,6 +3,8 @@ from bisect import bisect_right
 from logging import getLogger
 from math import sqrt
 
+import numpy as np
+
 from prettytable import PrettyTable
 
 
@@ -126,3 +128,46 @@ class TimeSeriesSamples(Samples):
         writer = csv.writer(f, lineterminator="\n")
         writer.writerow(["Time", "Value"])
         writer.writerows(zip(self.times, self.values))
+
+
+# Maximum of an array which is updated elementwise, in O(log n) per element
+class MaxSegmentTree:
+    def __init__(self, values):
+        values = np.asarray(values)
+        self._n = len(values)
+        self._size = 1 << max(self._n - 1, 0).bit_length()
+
+        if values.dtype.kind == "f":
+            fill = -inf
+        else:
+            fill = np.iinfo(values.dtype).min
+
+        self._tree = np.full(2 * self._size, fill, values.dtype)
+        self._tree[self._size:self._size + self._n] = values
+
+        # Build the tree bottom-up one level at a time
+        lo, hi = self._size // 2, self._size
+        while lo > 0:
+            self._tree[lo:hi] = np.maximum(self._tree[2 * lo:2 * hi:2],
+                                           self._tree[2 * lo + 1:2 * hi:2])
+            lo, hi = lo // 2, lo
+
+    def __len__(self):
+        return self._n
+
+    def update(self, ids, values):
+        nodes = np.asarray(ids) + self._size
+        self._tree[nodes] = values
+
+        nodes = np.unique(nodes // 2)
+        while len(nodes) and nodes[-1] > 0:
+            self._tree[nodes] = np.maximum(self._tree[2 * nodes],
+                                           self._tree[2 * nodes + 1])
+            nodes = np.unique(nodes[nodes > 1] // 2)
+
+    @property
+    def max(self):
+        if not self._n:
+            return -inf
+
+        return self._tree[1].item()
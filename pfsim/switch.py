@@ -4,19 +4,21 @@ from collections import defaultdict
 class FDB:
     def __init__(self):
         self._fdb = defaultdict(dict)
-        self._jobs = defaultdict(list)
+        # Entries installed by each job
+        self._jobs = {}
 
     def add(self, src, dst, next_node, job):
         self._fdb[src][dst] = next_node
-        self._jobs[job].append((src, dst))
+        self._jobs.setdefault(job, []).append((src, dst))
 
     def remove_job(self, job):
-        for src, dst in self._jobs[job]:
-            if dst not in self._fdb[src]:
+        for src, dst in self._jobs.pop(job, ()):
+            entries = self._fdb.get(src)
+            if entries is None or dst not in entries:
                 continue
-            del self._fdb[src][dst]
+            del entries[dst]
 
-            if not self._fdb[src]:
+            if not entries:
                 del self._fdb[src]
 
     def dump(self):
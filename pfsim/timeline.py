@@ -0,0 +1,113 @@
+from logging import getLogger
+
+from .host_selector import HostSelector
+from .job import Job
+from .process_mapper import ProcessMapper
+
+logger = getLogger(__name__)
+inf = float("inf")
+
+
+# Routers neither change job durations nor scheduling decisions. Hence
+# scenarios which only differ in the router share the same timeline of job
+# submissions and allocations, which is recorded once and replayed for the
+# other routers.
+class Timeline:
+    def __init__(self):
+        # (time, trace, duration) of each job in the order of submission
+        self.submissions = []
+        # Allocated host names and the host index of each rank, keyed by the
+        # index of the submission
+        self.allocations = {}
+
+    def __len__(self):
+        return len(self.submissions)
+
+
+class TimelineRecorder:
+    def __init__(self, simulator, timeline):
+        self.simulator = simulator
+        self.timeline = timeline
+        self._index = {}
+
+        simulator.subscribe("job.submitted", self._job_submitted, prio=inf)
+        simulator.subscribe("job.started", self._job_started, prio=inf)
+
+    def _job_submitted(self, job):
+        self._index[job] = len(self.timeline.submissions)
+        self.timeline.submissions.append((self.simulator.time,
+                                          job.generator.trace, job.duration))
+
+    def _job_started(self, job):
+        i = self._index.pop(job)
+        self.timeline.allocations[i] = ([host.name for host in job.hosts],
+                                        job.rank_hosts)
+
+
+class TimelineReplayer:
+    def __init__(self, timeline, cluster, simulator, workers=None):
+        self.timeline = timeline
+        self.cluster = cluster
+        self.simulator = simulator
+        # Number of processes parsing the traces
+        self.workers = workers
+
+        # Index of the next submission and of the submission of each job
+        # waiting for its allocation
+        self._next = 0
+        self._index = {}
+        # Job whose hosts have been selected most recently
+        self._selected = None
+
+        # Substitute recorded decisions for host selection and mapping
+        scheduler = cluster.scheduler
+        scheduler.selector = ReplayHostSelector(scheduler.selector, self)
+        scheduler.mapper = ReplayProcessMapper(self)
+
+        simulator.subscribe("simulator.started", self._submit_job)
+
+    def _submit_job(self, job=None, **kwargs):
+        if self._next == len(self.timeline):
+            return
+
+        time, trace, duration = self.timeline.submissions[self._next]
+        job = Job.from_trace(trace, duration, simulator=self.simulator,
+                             workers=self.workers)
+        self._index[job] = self._next
+        self._next += 1
+
+        self.simulator.subscribe("job.submitted", self._submit_job,
+                                 entity=job)
+        self.simulator.schedule("job.submitted", time, job=job)
+
+    def select(self, job):
+        host_names, _ = self.timeline.allocations[self._index[job]]
+        self._selected = job
+
+        return [self.cluster.hosts[name] for name in host_names]
+
+    def map(self, procs, hosts):
+        _, ranks = self.timeline.allocations[self._index.pop(self._selected)]
+
+        return {proc: hosts[i] for proc, i in zip(procs, ranks)}
+
+
+class ReplayHostSelector(HostSelector):
+    def __init__(self, selector, replayer, **kwargs):
+        super().__init__(selector.hosts)
+        self.selector = selector
+        self.replayer = replayer
+
+    def test(self, job):
+        return self.selector.test(job)
+
+    def select(self, job):
+        return self.replayer.select(job)
+
+
+class ReplayProcessMapper(ProcessMapper):
+    def __init__(self, replayer, **kwargs):
+        self.replayer = replayer
+
+    def map(self, procs, hosts):
+        return self.replayer.map(procs, hosts)
@@ -1,9 +1,11 @@
 from abc import ABC, abstractmethod
 from functools import reduce
-from itertools import count, islice, product
 from operator import mul
 
-import networkx as nx
+import numpy as np
+
+from .fabric import Fabric
+from .graphml_cache import load_graphml
 
 
 class Topology(ABC):
@@ -17,7 +19,7 @@ class FileTopology(Topology):
         self.path = str(base_path / path)
 
     def generate(self):
-        return nx.read_graphml(self.path)
+        return load_graphml(self.path)
 
 
 class NDTorusTopology(Topology):
@@ -29,37 +31,37 @@ class NDTorusTopology(Topology):
         self.npe = kwargs.get("npe", 1)
 
     def generate(self):
-        idx = 0
-        g = nx.DiGraph()
-
-        def _generate(n, dims):
-            nonlocal idx
-
-            # 1-D torus
-            if n == 1:
-                nodes = range(idx, idx + dims[0])
-                g.add_nodes_from(nodes, capacity=self.npe, typ="host")
-                g.add_cycle(nodes, capacity=self.bw)
-                g.add_cycle(reversed(nodes), capacity=self.bw)
-                idx += dims[0]
-                return
-
-            tmp = idx
-
-            # Generate dims[-1]x (n-1)-D torii
-            for i in range(dims[-1]):
-                _generate(n - 1, dims[:-1])
-
-            # Connect dims[-1]x (n-1)-D torii
-            sz = reduce(mul, dims[:-1], 1)
-            for i in range(tmp, tmp + sz):
-                indices = range(i, dims[-1] * sz + i, sz)
-                g.add_cycle(indices, capacity=self.bw)
-                g.add_cycle(reversed(indices), capacity=self.bw)
-
-        _generate(self.n, self.dims)
-
-        return g
+        dims = list(self.dims)
+        n_nodes = reduce(mul, dims, 1)
+        nodes = np.arange(n_nodes)
+
+        # Coordinates of every node, the first dimension varying fastest
+        coords = np.zeros((n_nodes, self.n), np.int64)
+        for d, k in enumerate(dims):
+            coords[:, d] = nodes // reduce(mul, dims[:d], 1) % k
+
+        # Links to the next and then the previous node along each dimension
+        # in turn, the order in which a node used to gain them
+        sources, targets = [], []
+        for d, k in enumerate(dims):
+            stride = reduce(mul, dims[:d], 1)
+            for step in [1, -1]:
+                sources.append(nodes)
+                targets.append(nodes + ((coords[:, d] + step) % k -
+                                        coords[:, d]) * stride)
+
+        sources = np.concatenate(sources) if sources else nodes
+        targets = np.concatenate(targets) if targets else nodes
+
+        return Fabric.from_edges(
+            range(n_nodes), sources, targets,
+            node_attrs={
+                "capacity": [self.npe] * n_nodes,
+                "typ": ["host"] * n_nodes,
+                "coords": list(map(tuple, coords.tolist()))
+            },
+            edge_attrs={"capacity": np.full(len(sources), self.bw)},
+            attrs={"topology": "torus", "dims": dims})
 
 
 class XGFTTopology(Topology):
@@ -73,25 +75,74 @@ class XGFTTopology(Topology):
         self.npe = kwargs.get("npe", 1)
 
     def generate(self):
-        idx = count()
-        g = nx.DiGraph()
-
-        def _generate(h, m, w):
-            if h == 0:
-                i = next(idx)
-                g.add_node(i, typ="host", capacity=self.npe)
-                return [i]
-
-            spines = list(islice(idx, reduce(mul, w, 1)))
-            g.add_nodes_from(spines, typ="switch")
-
-            for i in range(m[-1]):
-                leaves = _generate(h - 1, m[:-1], w[:-1])
-                g.add_edges_from(product(spines, leaves), capacity=self.bw)
-                g.add_edges_from(product(leaves, spines), capacity=self.bw)
-
-            return spines
-
-        _generate(self.h, self.m, self.w)
-
-        return g
+        h, m, w = self.h, list(self.m), list(self.w)
+
+        # Nodes are numbered in preorder: the W(l) = w[0] * ... * w[l-1] top
+        # switches of a level-l subtree come first, followed by its m[l-1]
+        # subtrees of size S(l-1) in turn
+        n_spines = [reduce(mul, w[:i], 1) for i in range(h + 1)]
+        size = [1]
+        for i in range(1, h + 1):
+            size.append(n_spines[i] + m[i - 1] * size[i - 1])
+
+        # First node of every subtree of each level, subtrees being numbered
+        # with the digit of the top level varying slowest
+        offsets = [None] * (h + 1)
+        offsets[h] = np.zeros(1, np.int64)
+        for i in range(h, 0, -1):
+            offsets[i - 1] = (offsets[i][:, None] + n_spines[i] +
+                              np.arange(m[i - 1]) * size[i - 1]).ravel()
+
+        # Every node is labeled with its level (0 for hosts) and coordinates
+        # of h digits. Digits below the level locate a switch among the top
+        # switches of its subtree, and the others locate the subtree itself,
+        # i.e. coords[l] is the index of the level-l subtree in its parent.
+        ids = []
+        level = np.zeros(size[h], np.int64)
+        coords = np.zeros((size[h], h), np.int64)
+        for i in range(h + 1):
+            ids.append(offsets[i][:, None] + np.arange(n_spines[i]))
+            spine, subtree = np.meshgrid(np.arange(n_spines[i]),
+                                         np.arange(len(offsets[i])))
+            nodes = ids[i].ravel()
+
+            level[nodes] = i
+            for k in range(i):
+                coords[nodes, k] = spine.ravel() // n_spines[k] % w[k]
+            for k in range(i, h):
+                coords[nodes, k] = subtree.ravel() // \
+                    reduce(mul, m[i:k], 1) % m[k]
+
+        # Each switch of a level-l subtree is connected with every top switch
+        # of its subtrees. A node gains its links to the lower level, ordered
+        # by subtree, before those to the upper level.
+        down, up = [], []
+        for i in range(1, h + 1):
+            spines = ids[i][:, :, None, None]
+            leaves = ids[i - 1].reshape(-1, 1, m[i - 1], n_spines[i - 1])
+            down.append(np.broadcast_arrays(spines, leaves))
+
+            spines = ids[i][:, None, None, :]
+            leaves = ids[i - 1].reshape(-1, m[i - 1], n_spines[i - 1], 1)
+            up.append(np.broadcast_arrays(leaves, spines))
+
+        pairs = down + up
+        sources = np.concatenate([u.ravel() for u, _ in pairs] +
+                                 [np.zeros(0, np.int64)])
+        targets = np.concatenate([v.ravel() for _, v in pairs] +
+                                 [np.zeros(0, np.int64)])
+
+        is_host = level == 0
+
+        return Fabric.from_edges(
+            range(size[h]), sources, targets,
+            node_attrs={
+                "typ": ["host" if host else "switch"
+                        for host in is_host.tolist()],
+                "capacity": [self.npe if host else None
+                             for host in is_host.tolist()],
+                "level": level.tolist(),
+                "coords": list(map(tuple, coords.tolist()))
+            },
+            edge_attrs={"capacity": np.full(len(sources), self.bw)},
+            attrs={"topology": "xgft", "h": self.h, "m": m, "w": w})
@@ -1,27 +1,164 @@
 import json
 import tarfile
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import current_process
+from os import getpid, replace, stat
+from pathlib import Path
 
 import networkx as nx
 
+import numpy as np
+
+
+# Traces packed by pack() are written next to the tarball they come from
+def packed_path(path):
+    return Path(str(path) + ".pftm")
+
+
+# Group raw members into lists of about size bytes
+def _batches(members, size):
+    batch = []
+    n_bytes = 0
+
+    for buf in members:
+        batch.append(buf)
+        n_bytes += len(buf)
+
+        if n_bytes >= size:
+            yield batch
+            batch = []
+            n_bytes = 0
+
+    if batch:
+        yield batch
+
+
+# Number of ranks, and source ranks, destination ranks and traffic of the
+# non-zero elements of a batch of members
+def _parse_ranks(batch):
+    elements = []
+
+    for buf in batch:
+        trace = json.loads(buf.decode("utf-8"))
+
+        dst = np.flatnonzero(np.asarray(trace["tx_messages"]) > 0)
+        traffic = np.asarray(trace["tx_bytes"], np.float64)[dst]
+        elements.append((np.full(len(dst), trace["rank"], np.int64), dst,
+                         traffic))
+
+    return (len(batch),) + tuple(map(np.concatenate, zip(*elements)))
+
 
 class TrafficMatrix:
-    _cache = {}
+    # Least recently used traces kept in memory
+    CACHE_SIZE = 32
+    _cache = OrderedDict()
+
+    # Traces loaded by preload(), kept for the lifetime of the process
+    _preloaded = {}
+
+    # Number of processes parsing the ranks of a trace tarball, and the
+    # approximate size in bytes of the batches of ranks sent to each
+    WORKERS = 1
+    BATCH_SIZE = 1 << 20
 
-    def __init__(self, n_procs, dok={}):
+    # Packed traces hold a header followed by the source ranks, destination
+    # ranks and traffic of the non-zero elements, in the order of the matrix
+    MAGIC = b"PFTM"
+    VERSION = 1
+
+    HEADER = np.dtype([
+        ("magic", "S4"),
+        ("version", "<u4"),
+        ("n_procs", "<i8"),
+        ("nnz", "<i8"),
+        ("dtype", "S8")
+    ])
+
+    def __init__(self, n_procs, dok=None, coo=None):
         self.n_procs = n_procs
-        self.dok = dok
+
+        if coo is None:
+            dok = dok or {}
+            n = len(dok)
+            coo = (np.fromiter((s for s, _ in dok), np.int64, n),
+                   np.fromiter((d for _, d in dok), np.int64, n),
+                   np.fromiter(dok.values(), np.float64, n))
+
+        # Non-zero elements sorted by source rank and then destination rank.
+        # Arrays already in order, e.g. memory-mapped ones, are kept as is.
+        src, dst, traffic = coo
+        keys = np.asarray(src, np.int64) * n_procs + dst
+        if (keys[1:] <= keys[:-1]).any():
+            (src, dst, traffic), _ = self._sum_duplicates(n_procs, keys,
+                                                          traffic)
+
+        self.src = src
+        self.dst = dst
+        self.traffic = traffic
+
+        self._dok = None
+        self._indptr = None
+
+    # Sorted elements from src * n_procs + dst keys, along with the number of
+    # elements summed into each of them
+    @staticmethod
+    def _sum_duplicates(n_procs, keys, traffic):
+        keys, inverse = np.unique(keys, return_inverse=True)
+        inverse = inverse.ravel()
+        n = max(n_procs, 1)
+
+        return ((keys // n, keys % n,
+                 np.bincount(inverse, traffic, len(keys))),
+                np.bincount(inverse, minlength=len(keys)))
+
+    # Matrix holding the given elements, summing those of the same pair
+    @classmethod
+    def from_elements(cls, n_procs, src, dst, traffic):
+        keys = np.asarray(src, np.int64) * n_procs + np.asarray(dst, np.int64)
+        coo, _ = cls._sum_duplicates(n_procs, keys,
+                                     np.asarray(traffic, np.float64))
+
+        return cls(n_procs, coo=coo)
+
+    # Compatibility view as a dict from (src, dst) to traffic, built on first
+    # use only
+    @property
+    def dok(self):
+        if self._dok is None:
+            self._dok = dict(zip(zip(self.src.tolist(), self.dst.tolist()),
+                                 self.traffic.tolist()))
+
+        return self._dok
+
+    # Source ranks, destination ranks and traffic of the non-zero elements as
+    # arrays, in the same order as the DOK
+    @property
+    def coo(self):
+        return self.src, self.dst, self.traffic
+
+    # Row pointers of the elements of each source rank, for a CSR view along
+    # with dst and traffic
+    @property
+    def indptr(self):
+        if self._indptr is None:
+            self._indptr = np.searchsorted(self.src,
+                                           np.arange(self.n_procs + 1))
+
+        return self._indptr
 
     def to_graph(self):
         g = nx.DiGraph()
         g.add_nodes_from(range(self.n_procs))
-
-        for (src, dst), traffic in self.dok.items():
-            g.add_edge(src, dst, traffic=traffic)
+        g.add_edges_from(zip(self.src.tolist(), self.dst.tolist(),
+                             ({"traffic": traffic}
+                              for traffic in self.traffic.tolist())))
 
         return g
 
     def __len__(self):
-        return len(self.dok)
+        return len(self.src)
 
     @property
     def density(self):
@@ -31,42 +168,209 @@ class TrafficMatrix:
     def sparsity(self):
         return 1.0 - self.density
 
-    @classmethod
-    def _load_single_file(cls, f, dok):
-        trace = json.loads(f.read().decode("utf-8"))
-        src = trace["rank"]
+    # Matrix with rank i renumbered to perm[i]
+    def permute(self, perm):
+        perm = np.asarray(perm, np.int64)
+
+        return self.from_elements(self.n_procs, perm[self.src],
+                                  perm[self.dst], self.traffic)
+
+    # Matrix between the n groups (e.g. hosts) ranks are mapped to, summing
+    # the traffic of the ranks of the same groups, optionally along with the
+    # number of elements summed into each element
+    def aggregate(self, mapping, n, return_counts=False):
+        mapping = np.asarray(mapping, np.int64)
+        coo, counts = self._sum_duplicates(
+            n, mapping[self.src] * n + mapping[self.dst], self.traffic)
+        matrix = TrafficMatrix(n, coo=coo)
+
+        if return_counts:
+            return matrix, counts
+
+        return matrix
+
+    # Positions of the k heaviest elements, all of them by default, heaviest
+    # first and ties in the order of the matrix
+    def top_k(self, k=None):
+        order = np.argsort(-self.traffic, kind="mergesort")
+
+        return order[:k]
+
+    def transpose(self):
+        return self.from_elements(self.n_procs, self.dst, self.src,
+                                  self.traffic)
+
+    # Sum of the matrix and its transpose, i.e. traffic in both directions
+    def symmetrize(self):
+        return self.from_elements(
+            self.n_procs, np.concatenate([self.src, self.dst]),
+            np.concatenate([self.dst, self.src]),
+            np.concatenate([self.traffic, self.traffic]))
 
-        for dst, tx_messages in enumerate(trace["tx_messages"]):
-            if tx_messages <= 0:
+    def scale(self, factor):
+        return TrafficMatrix(self.n_procs,
+                             coo=(self.src, self.dst, self.traffic * factor))
+
+    @classmethod
+    def _members(cls, tar):
+        # Iterating over the archive reads one member at a time instead of
+        # listing all of them first
+        for member in tar:
+            if not member.isfile() or not member.name.endswith(".json"):
                 continue
 
-            dok[(src, dst)] = trace["tx_bytes"][dst]
+            with tar.extractfile(member) as f:
+                yield f.read()
+
+    @classmethod
+    def _parse(cls, members, workers):
+        batches = _batches(members, cls.BATCH_SIZE)
+
+        # Worker processes of a pool cannot start processes of their own
+        if workers <= 1 or current_process().daemon:
+            yield from map(_parse_ranks, batches)
+            return
+
+        with ProcessPoolExecutor(workers) as executor:
+            # Bound the number of batches in flight so that the members read
+            # ahead of the workers do not pile up in memory
+            pending = deque()
+            for batch in batches:
+                pending.append(executor.submit(_parse_ranks, batch))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
 
     @classmethod
-    def _load(cls, f):
+    def _load(cls, f, workers=None):
         # c.f. https://www.wikiwand.com/en/Sparse_matrix
-        dok = {}
+        if workers is None:
+            workers = cls.WORKERS
+
+        elements = []
         n_procs = 0
 
         with tarfile.open(fileobj=f, mode="r:*") as tar:
-            for member in tar.getmembers():
-                if not member.isfile() or not member.name.endswith(".json"):
-                    continue
+            for n, src, dst, traffic in cls._parse(cls._members(tar),
+                                                   workers):
+                n_procs += n
+                elements.append((src, dst, traffic))
+
+        if not elements:
+            return cls(n_procs)
+
+        src, dst, traffic = map(np.concatenate, zip(*elements))
+
+        return cls.from_elements(n_procs, src, dst, traffic)
+
+    @classmethod
+    def _load_packed(cls, f):
+        header = np.frombuffer(f.read(cls.HEADER.itemsize), cls.HEADER)
+        if len(header) != 1 or header["magic"][0] != cls.MAGIC or \
+                header["version"][0] != cls.VERSION:
+            raise ValueError("Unsupported packed trace format")
+
+        n_procs = int(header["n_procs"][0])
+        nnz = int(header["nnz"][0])
+        dtypes = [np.int32, np.int32, np.dtype(header["dtype"][0].decode())]
+
+        # np.memmap cannot map an empty array
+        if nnz == 0:
+            return cls(n_procs, {})
 
-                with tar.extractfile(member) as f:
-                    cls._load_single_file(f, dok)
-                    n_procs += 1
+        arrays = []
+        offset = cls.HEADER.itemsize
+        for dtype in dtypes:
+            if hasattr(f, "name"):
+                array = np.memmap(f, dtype, "r", offset, (nnz,))
+            else:
+                array = np.frombuffer(f.read(np.dtype(dtype).itemsize * nnz),
+                                      dtype)
+            arrays.append(array)
+            offset += array.nbytes
 
-        return cls(n_procs, dok)
+        src, dst, traffic = arrays
+        if traffic.dtype != np.float64:
+            traffic = traffic.astype(np.float64)
+
+        return cls(n_procs, coo=(src, dst, traffic))
+
+    def save(self, f):
+        src, dst, traffic = self.coo
+
+        header = np.zeros(1, self.HEADER)
+        header["magic"] = self.MAGIC
+        header["version"] = self.VERSION
+        header["n_procs"] = self.n_procs
+        header["nnz"] = len(src)
+        header["dtype"] = traffic.dtype.str.encode()
+
+        for array in [header, src.astype(np.int32), dst.astype(np.int32),
+                      traffic]:
+            f.write(array.tobytes())
+
+    # Convert a trace tarball into a packed trace next to it
+    @classmethod
+    def pack(cls, path, workers=None):
+        with open(str(path), "rb") as f:
+            matrix = cls._load(f, workers)
+
+        # Write to a temporary file first so that concurrent workers never
+        # load a partial trace
+        out_path = packed_path(path)
+        tmp_path = Path("{0}.{1}.tmp".format(out_path, getpid()))
+
+        with open(str(tmp_path), "wb") as f:
+            matrix.save(f)
+
+        replace(str(tmp_path), str(out_path))
+
+        return out_path
 
     @classmethod
-    def load(cls, f):
+    def _load_any(cls, f, workers=None):
+        magic = f.read(len(cls.MAGIC))
+        f.seek(0)
+        if magic == cls.MAGIC:
+            return cls._load_packed(f)
+
+        # Use the packed form of a tarball unless it is outdated
+        if hasattr(f, "name"):
+            packed = packed_path(f.name)
+            try:
+                outdated = stat(str(packed)).st_mtime < stat(f.name).st_mtime
+            except OSError:
+                outdated = True
+
+            if not outdated:
+                with open(str(packed), "rb") as p:
+                    return cls._load_packed(p)
+
+        return cls._load(f, workers)
+
+    @classmethod
+    def preload(cls, path, workers=None):
+        if path not in cls._preloaded:
+            with open(path, "rb") as f:
+                cls._preloaded[path] = cls._load_any(f, workers)
+
+    @classmethod
+    def load(cls, f, workers=None):
+        if hasattr(f, "name") and f.name in cls._preloaded:
+            return cls._preloaded[f.name]
+
         if hasattr(f, "name") and f.name in cls._cache:
+            cls._cache.move_to_end(f.name)
             return cls._cache[f.name]
 
-        matrix = cls._load(f)
+        matrix = cls._load_any(f, workers)
 
         if hasattr(f, "name"):
             cls._cache[f.name] = matrix
 
+            while len(cls._cache) > cls.CACHE_SIZE:
+                cls._cache.popitem(last=False)
+
         return matrix
@@ -0,0 +1,256 @@
+import gc
+import weakref
+from collections import defaultdict
+
+import numpy as np
+
+from pfsim.cluster import Cluster
+from pfsim.collector import InterconnectMetricsCollector
+from pfsim.host_selector import LinearHostSelector
+from pfsim.job import Job
+from pfsim.link_state import LinkState
+from pfsim.process_mapper import CyclicProcessMapper
+from pfsim.router import DimensionOrderRouter, DmodKRouter
+from pfsim.scheduler import FCFSScheduler
+from pfsim.simulator import Simulator
+from pfsim.topology import NDTorusTopology, XGFTTopology
+from pfsim.traffic_matrix import TrafficMatrix
+
+
+class TestCluster:
+    def setup(self):
+        self.simulator = Simulator()
+        graph = XGFTTopology(h=2, m=[4, 4], w=[1, 2], npe=4).generate()
+
+        self.cluster = Cluster(graph=graph,
+                               host_selector=LinearHostSelector,
+                               process_mapper=CyclicProcessMapper,
+                               scheduler=FCFSScheduler,
+                               router=DmodKRouter,
+                               simulator=self.simulator)
+
+        n_procs = 24
+        dok = {(src, dst): (src * 7 + dst * 3) % 5 * 100
+               for src in range(n_procs) for dst in range(n_procs)
+               if (src + dst) % 3 and src != dst}
+        self.job = Job("j1", n_procs=n_procs, duration=5.0,
+                       traffic_matrix=TrafficMatrix(n_procs, dok),
+                       simulator=self.simulator, trace="trace.tar.gz")
+
+    def test_host_traffic(self):
+        self.simulator.schedule("job.submitted", job=self.job)
+        self.simulator.run_until(1.0)
+
+        host_tm = defaultdict(int)
+        host_fm = defaultdict(int)
+        for (src, dst), traffic in self.job.traffic_matrix.dok.items():
+            pair = (self.job.procs[src].host, self.job.procs[dst].host)
+            host_tm[pair] += traffic
+            host_fm[pair] += 1
+
+        expected = sorted(host_tm.items(), key=lambda x: x[1], reverse=True)
+        expected = [(src, dst, traffic, host_fm[(src, dst)])
+                    for (src, dst), traffic in expected]
+
+        assert self.cluster._host_traffic(self.job) == expected
+
+    def test_host_traffic_cache(self):
+        job = Job("j2", n_procs=self.job.n_procs, duration=5.0,
+                  traffic_matrix=self.job.traffic_matrix,
+                  simulator=self.simulator, trace=self.job.trace)
+
+        self.simulator.schedule("job.submitted", job=self.job)
+        self.simulator.schedule("job.submitted", job=job)
+        self.simulator.run_until(1.0)
+
+        assert not set(self.job.hosts) & set(job.hosts)
+        # Both jobs map their ranks to the same slots and share the traffic
+        assert len(self.cluster._slot_traffic_cache) == 1
+
+        index = {host: i for i, host in enumerate(job.hosts)}
+        expected = [(self.job.hosts.index(src), self.job.hosts.index(dst),
+                     traffic, flows) for src, dst, traffic, flows
+                    in self.cluster._host_traffic(self.job)]
+        actual = [(index[src], index[dst], traffic, flows)
+                  for src, dst, traffic, flows
+                  in self.cluster._host_traffic(job)]
+
+        assert actual == expected
+
+    def test_host_traffic_cache_refs(self):
+        self.simulator.schedule("job.submitted", job=self.job)
+        self.simulator.run_until(1.0)
+
+        matrix = TrafficMatrix(self.job.n_procs, {(0, 5): 100.0})
+        job = Job("j2", n_procs=self.job.n_procs, traffic_matrix=matrix,
+                  trace="other.tar.gz")
+        job.hosts = self.job.hosts
+        job.rank_hosts = self.job.rank_hosts
+
+        assert self.cluster._host_traffic(job) == \
+            [(job.hosts[job.rank_hosts[0]], job.hosts[job.rank_hosts[5]],
+              100.0, 1)]
+        assert len(self.cluster._slot_traffic_cache) == 2
+
+        # The cached traffic does not keep the matrix of the trace alive
+        ref = weakref.ref(matrix)
+        del job, matrix
+        gc.collect()
+
+        assert ref() is None
+
+    def test_job_switches(self):
+        self.simulator.schedule("job.submitted", job=self.job)
+        self.simulator.run_until(1.0)
+
+        switches = {switch for switch in self.cluster.switches.values()
+                    if self.job in switch.fdb._jobs}
+
+        assert switches
+        assert self.cluster._job_switches[self.job] == switches
+
+        self.simulator.run()
+
+        assert not self.cluster._job_switches
+
+    def test_link_usage(self):
+        self.simulator.schedule("job.submitted", job=self.job)
+        self.simulator.run_until(1.0)
+
+        links = self.cluster.links
+
+        assert len(self.job.link_ids) > 0
+        assert (links.traffic[self.job.link_ids] == self.job.link_usage).all()
+        assert (links.flows[self.job.link_ids] == self.job.link_flows).all()
+        assert links.traffic.sum() == self.job.link_usage.sum()
+
+        self.simulator.run()
+
+        assert not links.traffic.any()
+        assert not links.flows.any()
+
+        # No state of the finished job is left behind
+        assert not self.cluster.router.cache._jobs
+        for switch in self.cluster.switches.values():
+            assert not switch.fdb._jobs
+            assert not switch.fdb._fdb
+
+
+class TestClusterTorus:
+    def setup(self):
+        self.simulator = Simulator()
+        graph = NDTorusTopology(n=2, dims=[4, 4], npe=2).generate()
+
+        self.cluster = Cluster(graph=graph,
+                               host_selector=LinearHostSelector,
+                               process_mapper=CyclicProcessMapper,
+                               scheduler=FCFSScheduler,
+                               router=DimensionOrderRouter,
+                               simulator=self.simulator)
+
+        n_procs = 32
+        dok = {(src, dst): 100 for src in range(n_procs)
+               for dst in range(n_procs) if src != dst}
+        self.job = Job("j1", n_procs=n_procs, duration=5.0,
+                       traffic_matrix=TrafficMatrix(n_procs, dok),
+                       simulator=self.simulator)
+
+    def test_job(self):
+        collector = InterconnectMetricsCollector(self.simulator, self.cluster)
+
+        self.simulator.schedule("job.submitted", job=self.job)
+        self.simulator.run_until(1.0)
+
+        # Paths go through hosts only, which have no FDB
+        assert not self.cluster.switches
+        assert not self.cluster._job_switches[self.job]
+        assert len(self.job.link_ids) > 0
+
+        # Every link along the dimension-ordered paths carries the traffic,
+        # including the first and last ones
+        links = self.cluster.links
+        traffic = np.zeros(len(links))
+        flows = np.zeros(len(links), np.int64)
+
+        for src, dst, t, f in self.cluster._host_traffic(self.job):
+            path = [src.name]
+            for stride in [1, 4]:
+                target = dst.name // stride % 4
+                while path[-1] // stride % 4 != target:
+                    coord = path[-1] // stride % 4
+                    step = 1 if 2 * ((target - coord) % 4) <= 4 else -1
+                    path.append(path[-1] + ((coord + step) % 4 - coord) *
+                                stride)
+
+            ids = links.path_edges(path)
+            traffic[ids] += t
+            flows[ids] += f
+
+        assert links.traffic.tolist() == traffic.tolist()
+        assert links.flows.tolist() == flows.tolist()
+        assert (links.traffic[self.job.link_ids] ==
+                self.job.link_usage).all()
+
+        # Every link of the torus is covered by the metrics
+        assert collector.max_congestion.current_value == \
+            (links.traffic / links.capacity).max()
+        assert collector.max_flows.current_value == links.flows.max()
+
+        self.simulator.run()
+
+        assert self.job.finished_at == 5.0
+        assert not self.cluster.links.traffic.any()
+
+
+class TestLinkState:
+    def setup(self):
+        self.graph = XGFTTopology(h=2, m=[2, 2], w=[1, 2]).generate()
+        self.links = LinkState(self.graph, {3, 4, 6, 7})
+
+    def test_index(self):
+        assert len(self.links) == self.graph.n_edges
+
+        for i, (u, v) in enumerate(self.graph.edges()):
+            assert self.links.edge_id(u, v) == i
+            assert self.links.edge(i) == (u, v)
+
+    def test_network_links(self):
+        for i in range(len(self.links)):
+            u, v = self.links.edge(i)
+            assert self.links.network[i] == \
+                (self.graph.node_data(u)["typ"] ==
+                 self.graph.node_data(v)["typ"] == "switch")
+
+        assert self.links.network_links.tolist() == \
+            np.flatnonzero(self.links.network).tolist()
+
+        # Every link of a direct network connects two hosts
+        torus = NDTorusTopology(n=2, dims=[3, 3]).generate()
+        links = LinkState(torus, set(torus.nodes))
+        assert len(links.network_links) == len(links)
+
+    def test_path_edges(self):
+        path = [3, 2, 0, 5, 6]
+        ids = self.links.path_edges(path)
+
+        assert [self.links.edge(i) for i in ids] == list(zip(path, path[1:]))
+        assert len(self.links.path_edges([3])) == 0
+
+    def test_add_remove(self):
+        ids = self.links.path_edges([3, 2, 0, 5, 6])
+
+        self.links.add(ids, 10.0, 2)
+        assert self.links.traffic[ids].tolist() == [10.0] * 4
+        assert self.links.flows[ids].tolist() == [2] * 4
+
+        self.links.remove(ids, 10.0, 2)
+        assert not self.links.traffic.any()
+        assert not self.links.flows.any()
+
+    def test_paths_edges(self):
+        paths = [[3, 2, 0, 5, 6], [3, 2, 1, 5, 6]]
+        ids = self.links.paths_edges(paths)
+
+        assert ids.shape == (2, 4)
+        for path, row in zip(paths, ids):
+            assert row.tolist() == self.links.path_edges(path).tolist()
@@ -2,9 +2,12 @@ from unittest.mock import MagicMock
 
 import networkx as nx
 
+import numpy as np
+
 from pfsim.collector import InterconnectMetricsCollector
 from pfsim.collector import SchedulerMetricsCollector
 from pfsim.host import Host
+from pfsim.link_state import LinkState
 from pfsim.simulator import Simulator
 from pfsim.switch import Switch
 
@@ -102,31 +105,69 @@ class TestInterconnectMetricsCollector:
         self.g[self.s1][self.s2]["capacity"] = 2
         self.g[self.s2][self.h2]["capacity"] = 1
         self.cluster.graph = self.g
+        self.cluster.links = LinkState(self.g, self.cluster.hosts)
+        self.links = self.cluster.links
 
         self.collector = InterconnectMetricsCollector(self.sim, self.cluster)
 
     def test_collect(self):
-        self.g[self.h1][self.s1]["traffic"] = 1
-        self.g[self.s1][self.s2]["traffic"] = 1
-        self.g[self.s2][self.h2]["traffic"] = 1
+        job = MagicMock()
+        job.link_ids = np.arange(len(self.links))
 
-        self.g[self.h1][self.s1]["flows"] = 10
-        self.g[self.s1][self.s2]["flows"] = 10
-        self.g[self.s2][self.h2]["flows"] = 10
+        self.links.traffic[:] = 1
+        self.links.flows[:] = 10
 
-        self.sim.schedule("job.started", 0.0)
+        self.sim.schedule("job.started", 0.0, job=job)
         self.sim.run()
 
-        self.g[self.h1][self.s1]["traffic"] = 0
-        self.g[self.s1][self.s2]["traffic"] = 0
-        self.g[self.s2][self.h2]["traffic"] = 0
-
-        self.g[self.h1][self.s1]["flows"] = 0
-        self.g[self.s1][self.s2]["flows"] = 0
-        self.g[self.s2][self.h2]["flows"] = 0
+        self.links.traffic[:] = 0
+        self.links.flows[:] = 0
 
-        self.sim.schedule("job.finished", 1.0)
+        self.sim.schedule("job.finished", 1.0, job=job)
         self.sim.run()
 
         assert self.collector.max_congestion[0.0] == 0.5
         assert self.collector.max_flows[0.0] == 10
+
+
+class TestInterconnectMetricsIncremental:
+    def setup(self):
+        self.sim = Simulator()
+
+        self.g = nx.complete_graph(12, create_using=nx.DiGraph())
+        self.cluster = MagicMock()
+        self.cluster.hosts = {0, 1}
+        self.cluster.links = LinkState(self.g, self.cluster.hosts)
+        self.links = self.cluster.links
+
+        self.collector = InterconnectMetricsCollector(self.sim, self.cluster)
+        self.collector.MAX_CANCELLATION = 1e3
+
+    def test_collect(self):
+        rng = np.random.RandomState(0)
+        ids = self.links.network_links
+
+        for i in range(50):
+            job = MagicMock()
+            job.link_ids = rng.choice(len(self.links), 10, replace=False)
+
+            # Loads rise and fall back to zero as jobs start and finish
+            if i % 5:
+                self.links.traffic[job.link_ids] += rng.randint(0, 1e9, 10)
+                self.links.flows[job.link_ids] += rng.randint(0, 5, 10)
+            else:
+                self.links.traffic[:] = 0
+                self.links.flows[:] = 0
+                job.link_ids = np.arange(len(self.links))
+
+            self.sim.schedule("job.started", float(i), job=job)
+            self.sim.run()
+
+            congestion = self.links.traffic[ids] / self.links.capacity[ids]
+
+            assert self.collector.max_congestion.current_value == \
+                congestion.max()
+            assert self.collector.max_flows.current_value == \
+                self.links.flows[ids].max()
+            assert abs(self.collector.stddev_congestion.current_value -
+                       congestion.std(ddof=1)) <= 1e-9 * congestion.max()
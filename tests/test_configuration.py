@@ -85,6 +85,11 @@ class TestScenarioConf:
         assert conf.host_selector == "FooHostSelector"
         assert conf.process_mapper == "FooProcessMapper"
         assert conf.router == "FooRouter"
+        assert conf.event_queue == "pfsim.event_queue.BinaryHeapQueue"
+        assert conf.share_timeline
+        assert conf.route_cache is None
+        assert conf.router_seed is None
+        assert conf.trace_workers is None
 
         assert len(conf.jobs) == 1
 
@@ -115,3 +120,9 @@ class TestScenarioConf:
 
         for combination in algo_comninations_expected:
             assert combination in algo_combinations
+
+    def test_event_queue(self):
+        fixture = dict(FIXTURE_SINGLE, event_queue="FooQueue")
+        confs = list(Scenario.generate_from_yaml(fixture))
+
+        assert confs[0].event_queue == "FooQueue"
@@ -0,0 +1,143 @@
+import random
+
+from pfsim.event_queue import BinaryHeapQueue, CalendarQueue, LadderQueue
+from pfsim.simulator import Event
+
+
+class EventQueueTestBase:
+    queue_class = None
+
+    def setup(self):
+        self.queue = self.queue_class()
+        self.seq = 0
+
+    def _push(self, time):
+        ev = Event("test", time, seq=self.seq)
+        self.seq += 1
+        self.queue.push(ev)
+
+        return ev
+
+    def _pop_all(self):
+        events = []
+        while self.queue:
+            events.append(self.queue.pop())
+
+        return events
+
+    def test_empty(self):
+        assert len(self.queue) == 0
+        assert self.queue.peek() is None
+
+        try:
+            self.queue.pop()
+        except IndexError:
+            pass
+        else:
+            assert False
+
+    def test_ordering(self):
+        random.seed(0)
+        times = [random.expovariate(1.0) for _ in range(1000)]
+
+        for time in times:
+            self._push(time)
+
+        assert len(self.queue) == 1000
+        assert [ev.time for ev in self._pop_all()] == sorted(times)
+
+    def test_simultaneous(self):
+        events = [self._push(t) for t in [2.0, 1.0, 2.0, 1.0, 2.0] * 30]
+
+        popped = self._pop_all()
+        expected = sorted(events, key=lambda ev: (ev.time, ev.seq))
+
+        assert popped == expected
+
+    def test_peek(self):
+        self._push(3.0)
+        ev = self._push(1.0)
+        self._push(2.0)
+
+        assert self.queue.peek() is ev
+        assert len(self.queue) == 3
+        assert self.queue.pop() is ev
+
+    def test_hold(self):
+        random.seed(1)
+        now = 0.0
+
+        for _ in range(500):
+            self._push(now + random.expovariate(1.0))
+
+        for _ in range(5000):
+            ev = self.queue.pop()
+            assert ev.time >= now
+            now = ev.time
+
+            # Schedule one or two events, or sometimes one at the current time
+            self._push(now + random.choice([0.0, random.expovariate(1.0)]))
+            if random.random() < 0.1:
+                self._push(now + random.expovariate(0.01))
+
+        popped = self._pop_all()
+        assert [ev.time for ev in popped] == sorted(ev.time for ev in popped)
+        assert popped[0].time >= now
+
+    def test_cancel(self):
+        events = [self._push(float(t)) for t in range(10)]
+
+        assert self.queue.cancel(events[0])
+        assert self.queue.cancel(events[5])
+        assert not self.queue.cancel(events[5])
+
+        assert len(self.queue) == 8
+        assert self.queue.peek() is events[1]
+        assert self._pop_all() == events[1:5] + events[6:]
+        assert not self.queue.cancel(events[1])
+
+    def test_compaction(self):
+        events = [self._push(float(t)) for t in range(1000)]
+
+        for ev in events[:900]:
+            self.queue.cancel(ev)
+
+        # Tombstones have been dropped well before all events are cancelled
+        assert self.queue._n_events < 1000 - 500
+        assert len(self.queue) == 100
+        assert self._pop_all() == events[900:]
+
+    def test_cancel_resize(self):
+        events = [self._push(float(t)) for t in range(3)]
+        self.queue.cancel(events[1])
+
+        # Enough events for the calendar queue to grow and drop the tombstone
+        events += [self._push(float(t)) for t in range(3, 20)]
+
+        assert len(self.queue) == 19
+        assert self._pop_all() == events[:1] + events[2:]
+        assert self.queue.peek() is None
+        assert self.queue._n_events == 0
+        assert self.queue._n_cancelled == 0
+
+        # Likewise when shrinking while events are popped
+        events = [self._push(float(t)) for t in range(40)]
+        for ev in events[10:20]:
+            self.queue.cancel(ev)
+
+        assert self._pop_all() == events[:10] + events[20:]
+        assert self.queue.peek() is None
+        assert self.queue._n_events == 0
+        assert self.queue._n_cancelled == 0
+
+
+class TestBinaryHeapQueue(EventQueueTestBase):
+    queue_class = BinaryHeapQueue
+
+
+class TestCalendarQueue(EventQueueTestBase):
+    queue_class = CalendarQueue
+
+
+class TestLadderQueue(EventQueueTestBase):
+    queue_class = LadderQueue
@@ -0,0 +1,72 @@
+import networkx as nx
+
+import numpy as np
+
+from pfsim.fabric import Fabric, as_fabric
+
+
+class TestFabric:
+    def setup(self):
+        self.graph = nx.DiGraph(name="test")
+        self.graph.add_node("h1", typ="host", capacity=2)
+        self.graph.add_node("h2", typ="host", capacity=4)
+        self.graph.add_node("s1", typ="switch", dpid=1)
+        self.graph.add_edges_from([("h1", "s1"), ("s1", "h1"),
+                                   ("h2", "s1"), ("s1", "h2")],
+                                  capacity=10, port=1)
+        self.graph["s1"]["h2"]["port"] = 2
+
+        self.fabric = Fabric.from_networkx(self.graph)
+
+    def test_from_networkx(self):
+        assert len(self.fabric) == 3
+        assert self.fabric.n_edges == 4
+        assert self.fabric.name == "test"
+        assert self.fabric.nodes == self.graph.nodes()
+        assert self.fabric.edges() == self.graph.edges()
+
+        assert self.fabric.node_data("h2") == {"typ": "host", "capacity": 4}
+        assert self.fabric.node_data("s1") == {"typ": "switch", "dpid": 1}
+        assert self.fabric.column("capacity") == [2, 4, None]
+        assert self.fabric.successors("s1") == ["h1", "h2"]
+
+        assert isinstance(self.fabric.edge_attrs["port"], np.ndarray)
+        assert self.fabric.edge_column("capacity").tolist() == [10] * 4
+        assert self.fabric.edge_column("flows", 0).tolist() == [0] * 4
+
+    def test_to_networkx(self):
+        graph = self.fabric.to_networkx()
+
+        assert graph.graph == self.graph.graph
+        assert graph.nodes(data=True) == self.graph.nodes(data=True)
+        assert graph.edges(data=True) == self.graph.edges(data=True)
+
+    def test_from_edges(self):
+        # Grouped by source in insertion order, duplicates dropped
+        fabric = Fabric.from_edges(["a", "b", "c"], [2, 0, 2, 1, 0, 2],
+                                   [0, 2, 1, 0, 2, 0],
+                                   edge_attrs={"w": np.arange(6)})
+
+        assert fabric.edges() == [("a", "c"), ("b", "a"), ("c", "a"),
+                                  ("c", "b")]
+        assert fabric.edge_attrs["w"].tolist() == [1, 3, 0, 2]
+
+    def test_edge_ids(self):
+        for i, (u, v) in enumerate(self.graph.edges()):
+            assert self.fabric.edge_id(u, v) == i
+
+        index = self.fabric.index
+        ids = self.fabric.edge_ids([index["h1"], index["s1"]],
+                                   [index["s1"], index["h2"]])
+        assert ids.tolist() == [0, 3]
+
+        try:
+            self.fabric.edge_id("h1", "h2")
+        except KeyError:
+            pass
+        else:
+            assert False
+
+    def test_as_fabric(self):
+        assert as_fabric(self.fabric) is self.fabric
+        assert as_fabric(self.graph).edges() == self.fabric.edges()
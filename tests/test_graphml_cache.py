@@ -0,0 +1,73 @@
+import shutil
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import networkx as nx
+
+from pfsim.graphml_cache import cache_path, compile_graphml, load_compiled, \
+    load_graphml
+from pfsim.topology import FileTopology
+
+TOPOLOGY = Path(__file__).parents[1] / "example" / "topologies" / \
+    "milk.graphml"
+
+
+class TestGraphMLCache:
+    def setup(self):
+        self.tmpdir = TemporaryDirectory()
+        self.base_path = Path(self.tmpdir.name)
+        self.path = self.base_path / "milk.graphml"
+        shutil.copy(str(TOPOLOGY), str(self.path))
+
+        self.expected = nx.read_graphml(str(self.path))
+
+    def teardown(self):
+        self.tmpdir.cleanup()
+
+    def _assert_same(self, fabric):
+        graph = fabric.to_networkx()
+
+        assert graph.graph == self.expected.graph
+        assert graph.nodes(data=True) == self.expected.nodes(data=True)
+        assert graph.edges(data=True) == self.expected.edges(data=True)
+
+    def test_compile(self):
+        assert load_compiled(self.path) is None
+
+        compile_graphml(self.path)
+        assert cache_path(self.path).exists()
+
+        self._assert_same(load_compiled(self.path))
+
+    def test_load(self):
+        # Compiled on the first load, then read from the compiled file
+        self._assert_same(load_graphml(self.path))
+        assert cache_path(self.path).exists()
+
+        self._assert_same(load_graphml(self.path))
+        self._assert_same(FileTopology(self.base_path,
+                                       "milk.graphml").generate())
+
+    def test_stale(self):
+        compile_graphml(self.path)
+
+        graph = nx.read_graphml(str(self.path))
+        graph.add_node("extra", typ="host", capacity=1)
+        nx.write_graphml(graph, str(self.path))
+
+        assert load_compiled(self.path) is None
+        assert "extra" in load_graphml(self.path)
+        assert "extra" in load_compiled(self.path)
+
+    def test_attributes(self):
+        graph = nx.DiGraph(name="test")
+        graph.add_node("a", typ="host", capacity=2, speed=1.5, up=True)
+        graph.add_node("b", typ="switch", dpid=2 ** 64 - 1)
+        graph.add_edge("a", "b", port=1)
+        graph.add_edge("b", "a")
+        nx.write_graphml(graph, str(self.path))
+
+        self.expected = nx.read_graphml(str(self.path))
+        compile_graphml(self.path)
+
+        self._assert_same(load_compiled(self.path))
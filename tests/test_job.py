@@ -27,3 +27,15 @@ class TestJob:
         assert job2.created_at == 2.5
         assert job2.started_at == 3.5
         assert job2.finished_at == 4.5
+
+    def test_release(self):
+        job = Job("job", simulator=self.sim)
+
+        self.sim.schedule("job.submitted", 1.0, job=job)
+        self.sim.schedule("job.started", 2.0, job=job)
+        self.sim.schedule("job.finished", 3.0, job=job)
+        self.sim.run()
+
+        assert not self.sim.entity_handlers
+        assert job.hosts == [] and job.procs == []
+        assert job.finished_at == 3.0
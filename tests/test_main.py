@@ -1,6 +1,6 @@
 from logging import DEBUG, INFO, getLogger
 from unittest import TestCase
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, call, patch
 
 from docopt import DocoptExit
 
@@ -43,3 +43,31 @@ class TestMain(TestCase):
                 main()
                 MockRunner.assert_called_once_with("bar.yml")
                 mock.run_parallel.assert_called_once_with(4)
+
+    @patch("pfsim.compile_graphml")
+    @patch("pfsim.SimulationRunner")
+    def test_compile_topology(self, MockRunner, mock_compile):
+        with patch("sys.argv",
+                   "__main__.py compile-topology a.graphml b.graphml".split()):
+            main()
+            mock_compile.assert_has_calls([call("a.graphml"),
+                                           call("b.graphml")])
+            MockRunner.assert_not_called()
+
+    @patch("pfsim.TrafficMatrix")
+    @patch("pfsim.SimulationRunner")
+    def test_pack_trace(self, MockRunner, MockMatrix):
+        with patch("sys.argv",
+                   "__main__.py pack-trace a.tar.gz b.tar.gz".split()):
+            main()
+            MockMatrix.pack.assert_has_calls([call("a.tar.gz", None),
+                                              call("b.tar.gz", None)])
+            MockRunner.assert_not_called()
+
+    @patch("pfsim.TrafficMatrix")
+    @patch("pfsim.SimulationRunner")
+    def test_pack_trace_parallel(self, MockRunner, MockMatrix):
+        with patch("sys.argv", "__main__.py -p 4 pack-trace a.tar.gz".split()):
+            main()
+            MockMatrix.pack.assert_called_once_with("a.tar.gz", 4)
+            MockRunner.assert_not_called()
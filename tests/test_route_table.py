@@ -0,0 +1,66 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import networkx as nx
+
+import numpy as np
+
+from pfsim.fabric import Fabric
+from pfsim.route_table import RouteTable
+
+
+class TestRouteTable:
+    def setup(self):
+        self.tmpdir = TemporaryDirectory()
+        self.path = Path(self.tmpdir.name) / "table.routes"
+
+    def teardown(self):
+        self.tmpdir.cleanup()
+
+    def test_empty(self):
+        table = RouteTable.load(self.path)
+
+        assert len(table) == 0
+        assert table.get(0) is None
+
+        table.save(self.path)
+        assert len(RouteTable.load(self.path)) == 0
+
+    def test_save_load(self):
+        routes = {7: [1, 2, 3], 2: [4], 5: [0, 6]}
+        RouteTable().merge(routes).save(self.path)
+
+        table = RouteTable.load(self.path)
+
+        assert isinstance(table.keys, np.memmap)
+        assert len(table) == 3
+        for key, route in routes.items():
+            assert key in table
+            assert table.get(key).tolist() == route
+        assert 3 not in table
+        assert table.get(8) is None
+
+    def test_merge(self):
+        table = RouteTable().merge({1: [1, 2], 3: [3, 4]})
+        table = table.merge({2: [5], 3: [6, 7]})
+
+        assert table.keys.tolist() == [1, 2, 3]
+        assert table.get(3).tolist() == [6, 7]
+
+    def test_incompatible(self):
+        RouteTable().merge({1: [1, 2]}).save(self.path)
+
+        with open(str(self.path), "r+b") as f:
+            f.write(b"XXXX")
+
+        assert len(RouteTable.load(self.path)) == 0
+
+    def test_digest(self):
+        g1 = Fabric.from_networkx(nx.path_graph(4, nx.DiGraph()))
+        g2 = Fabric.from_networkx(nx.path_graph(4, nx.DiGraph()))
+
+        assert RouteTable.digest(g1, "A") == RouteTable.digest(g2, "A")
+        assert RouteTable.digest(g1, "A") != RouteTable.digest(g1, "B")
+
+        g2 = Fabric.from_networkx(nx.cycle_graph(4, nx.DiGraph()))
+        assert RouteTable.digest(g1, "A") != RouteTable.digest(g2, "A")
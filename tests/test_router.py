@@ -1,7 +1,13 @@
+import random
+from tempfile import TemporaryDirectory
+
 import networkx as nx
 
 from pfsim.host import Host
-from pfsim.router import DmodKRouter, GreedyRouter, GreedyRouter2, RandomRouter
+from pfsim.router import DimensionOrderRouter, DmodKRouter, GreedyRouter, \
+    GreedyRouter2, PathCache, PersistentPathCache, RandomRouter
+from pfsim.shortest_paths import ShortestPaths
+from pfsim.topology import NDTorusTopology, XGFTTopology
 
 
 class TestRandomRouter:
@@ -37,6 +43,71 @@ class TestRandomRouter:
 
         assert path1 == path2
 
+    def test_seed(self):
+        router1 = RandomRouter(self.graph, seed=1)
+        router2 = RandomRouter(self.graph, seed=1)
+
+        # Paths do not depend on the order in which pairs are routed
+        path1 = router1.route(self.h1, self.h2)
+        router2.route(self.h2, self.h1)
+        path2 = router2.route(self.h1, self.h2)
+
+        assert path1 == path2
+        assert router1.static
+        assert not self.router.static
+
+
+class TestPersistentPathCache:
+    def setup(self):
+        self.tmpdir = TemporaryDirectory()
+        self.graph = XGFTTopology(h=2, m=[4, 4], w=[1, 2]).generate()
+        self.hosts = [Host(u) for u, d in self.graph.node_data()
+                      if d["typ"] == "host"]
+
+    def teardown(self):
+        self.tmpdir.cleanup()
+
+    def _route_all(self, router):
+        return [router.route(src, dst) for src in self.hosts
+                for dst in self.hosts]
+
+    def test_dmodk(self):
+        router = DmodKRouter(self.graph, hosts=self.hosts,
+                             route_cache=self.tmpdir.name)
+        assert isinstance(router.cache, PersistentPathCache)
+
+        expected = self._route_all(router)
+        router.cache.save()
+
+        # Another run loads the routes without computing them
+        router = DmodKRouter(self.graph, hosts=self.hosts,
+                             route_cache=self.tmpdir.name)
+        router._route_xgft = None
+        assert len(router.cache.table) == len(self.hosts) ** 2
+        assert self._route_all(router) == expected
+
+    def test_random(self):
+        router = RandomRouter(self.graph, hosts=self.hosts, seed=1,
+                              route_cache=self.tmpdir.name)
+        expected = self._route_all(router)
+        router.cache.save()
+
+        router = RandomRouter(self.graph, hosts=self.hosts, seed=1,
+                              route_cache=self.tmpdir.name)
+        assert self._route_all(router) == expected
+
+        # Routers giving different paths do not share the table
+        router = RandomRouter(self.graph, hosts=self.hosts, seed=2,
+                              route_cache=self.tmpdir.name)
+        assert len(router.cache.table) == 0
+
+    def test_non_static(self):
+        for router in [RandomRouter(self.graph, hosts=self.hosts,
+                                    route_cache=self.tmpdir.name),
+                       GreedyRouter(self.graph, hosts=self.hosts,
+                                    route_cache=self.tmpdir.name)]:
+            assert type(router.cache) is PathCache
+
 
 class TestDmodKRouter:
     def setup(self):
@@ -86,6 +157,25 @@ class TestDmodKRouter:
         assert path1 == path2
 
 
+class TestDmodKRouterXGFT:
+    def setup(self):
+        self.graph = XGFTTopology(h=3, m=[3, 2, 3], w=[1, 2, 3]).generate()
+        self.hosts = [Host(u) for u, d in self.graph.node_data()
+                      if d["typ"] == "host"]
+
+        self.router = DmodKRouter(self.graph, hosts=self.hosts)
+
+    def test_closed_form(self):
+        # Same paths as the generic algorithm on an unlabeled graph
+        graph = nx.DiGraph(self.graph.edges())
+        generic = DmodKRouter(graph, hosts=self.hosts)
+        assert generic._spines is None
+
+        for src in self.hosts:
+            for dst in self.hosts:
+                assert self.router.route(src, dst) == generic.route(src, dst)
+
+
 class TestGreedyRouter:
     def setup(self):
         self.graph = nx.DiGraph()
@@ -160,3 +250,100 @@ class TestGreedyRouter2:
         path2 = self.router.route(self.h1, self.h2)
 
         assert path1 == path2
+
+
+class TestDimensionOrderRouter:
+    def setup(self):
+        self.graph = NDTorusTopology(n=3, dims=[3, 4, 5]).generate()
+        self.hosts = [Host(u) for u in self.graph.nodes]
+
+        self.router = DimensionOrderRouter(self.graph, hosts=self.hosts)
+
+    def test_intra_node(self):
+        path = self.router.route(self.hosts[7], self.hosts[7])
+
+        assert path == [7]
+
+    def test_wraparound(self):
+        path = self.router.route(self.hosts[0], self.hosts[2])
+        assert path == [0, 2]
+
+        # Positive direction on a tie
+        path = self.router.route(self.hosts[0], self.hosts[6])
+        assert path == [0, 3, 6]
+
+        path = self.router.route(self.hosts[0], self.hosts[36])
+        assert path == [0, 48, 36]
+
+    def test_minimal(self):
+        paths = ShortestPaths(self.graph)
+        edges = set(self.graph.edges())
+
+        for src in self.hosts:
+            for dst in self.hosts:
+                path = self.router.route(src, dst)
+
+                assert path[0] == src.name
+                assert path[-1] == dst.name
+                assert len(path) - 1 == paths.distance(src.name, dst.name)
+                assert set(zip(path, path[1:])) <= edges
+
+                # Dimensions are traversed in order
+                coords = [self.graph.node_data(u)["coords"] for u in path]
+                dims = [[a != b for a, b in zip(c1, c2)].index(True)
+                        for c1, c2 in zip(coords, coords[1:])]
+                assert dims == sorted(dims)
+
+
+class TestRouteMany:
+    def setup(self):
+        # Without labels so that D-mod-K uses the generic algorithm
+        graph = XGFTTopology(h=3, m=[3, 2, 3], w=[1, 2, 3]).generate()
+        self.graph = nx.DiGraph(graph.edges())
+        self.hosts = [Host(u) for u, d in graph.node_data()
+                      if d["typ"] == "host"]
+
+        rng = random.Random(0)
+        self.pairs = [(rng.choice(self.hosts), rng.choice(self.hosts))
+                      for _ in range(200)]
+
+    def _check(self, router_class, **kwargs):
+        router1 = router_class(self.graph, hosts=self.hosts, **kwargs)
+        router2 = router_class(self.graph, hosts=self.hosts, **kwargs)
+
+        # Load the links along each path before routing the next pair
+        for (src, dst), ids in zip(self.pairs,
+                                   router1.route_many(self.pairs)):
+            expected = router2.links.path_edges(router2.route(src, dst))
+            assert ids.tolist() == expected.tolist()
+
+            router1.links.add(ids, 1.0, 1)
+            router2.links.add(expected, 1.0, 1)
+
+        assert router1.cache._cache == router2.cache._cache
+
+    def test_dmodk(self):
+        self._check(DmodKRouter)
+
+    def test_dmodk_xgft(self):
+        self.graph = XGFTTopology(h=3, m=[3, 2, 3], w=[1, 2, 3]).generate()
+
+        self._check(DmodKRouter)
+
+    def test_random(self):
+        self._check(RandomRouter, seed=1)
+
+    def test_greedy(self):
+        self._check(GreedyRouter)
+
+    def test_greedy2(self):
+        self._check(GreedyRouter2)
+
+    def test_dimension_order(self):
+        for dims in [[4, 5], [2, 1, 3]]:
+            self.graph = NDTorusTopology(n=len(dims), dims=dims).generate()
+            self.hosts = [Host(u) for u in self.graph.nodes]
+            self.pairs = [(src, dst) for src in self.hosts
+                          for dst in self.hosts]
+
+            self._check(DimensionOrderRouter)
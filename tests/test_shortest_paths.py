@@ -0,0 +1,102 @@
+import random
+
+import networkx as nx
+
+import numpy as np
+
+from pfsim.shortest_paths import ShortestPaths
+from pfsim.topology import NDTorusTopology, XGFTTopology
+
+
+class ShortestPathsTestBase:
+    def setup(self):
+        self.paths = ShortestPaths(self.graph)
+        self.rng = random.Random(0)
+        self.nodes = self.graph.nodes()
+
+    def _pairs(self, n=100):
+        for _ in range(n):
+            src, dst = self.rng.choice(self.nodes), self.rng.choice(self.nodes)
+
+            try:
+                expected = list(nx.all_shortest_paths(self.graph, src, dst))
+            except nx.NetworkXNoPath:
+                continue
+
+            yield src, dst, expected
+
+    def test_all_paths(self):
+        for src, dst, expected in self._pairs():
+            assert list(self.paths.all_paths(src, dst)) == expected
+            assert self.paths.count_paths(src, dst) == len(expected)
+            assert self.paths.distance(src, dst) == len(expected[0]) - 1
+
+    def test_sample_path(self):
+        for src, dst, expected in self._pairs():
+            rng1, rng2 = random.Random(1), random.Random(1)
+
+            for _ in range(3):
+                assert self.paths.sample_path(src, dst, rng1) == \
+                    rng2.choice(expected)
+
+    def test_next_hops(self):
+        for src, dst, expected in self._pairs():
+            if src == dst:
+                continue
+
+            assert self.paths.next_hops(src, dst) == \
+                sorted({path[1] for path in expected})
+
+    def _brute_force(self, paths, weights, cost):
+        index = {edge: i for i, edge in enumerate(self.graph.edges_iter())}
+        costs = [cost([weights[index[edge]] for edge in zip(path, path[1:])])
+                 for path in paths]
+
+        return paths[costs.index(min(costs))]
+
+    def test_optimal_path(self):
+        n_links = self.graph.number_of_edges()
+
+        # Few distinct weights to exercise tie-breaking
+        for weights in [np.zeros(n_links),
+                        np.random.RandomState(0).randint(0, 3, n_links) * 1.0,
+                        np.random.RandomState(1).rand(n_links)]:
+            for src, dst, expected in self._pairs():
+                assert self.paths.optimal_path(src, dst, weights) == \
+                    self._brute_force(expected, weights, sum)
+                assert self.paths.optimal_path(src, dst, weights,
+                                               bottleneck=True) == \
+                    self._brute_force(expected, weights,
+                                      lambda w: max(w, default=0.0))
+
+
+class TestXGFT(ShortestPathsTestBase):
+    def setup(self):
+        topology = XGFTTopology(h=3, m=[4, 4, 3], w=[1, 2, 2])
+        self.graph = topology.generate().to_networkx()
+        super().setup()
+
+
+class TestTorus(ShortestPathsTestBase):
+    def setup(self):
+        self.graph = NDTorusTopology(n=2, dims=[4, 5]).generate().to_networkx()
+        super().setup()
+
+
+class TestRandomGraph(ShortestPathsTestBase):
+    def setup(self):
+        self.graph = nx.gnp_random_graph(60, 0.08, seed=1, directed=True)
+        super().setup()
+
+    def test_no_path(self):
+        self.graph.add_node("isolated")
+        paths = ShortestPaths(self.graph)
+
+        for fn in [paths.count_paths, paths.next_hops,
+                   lambda src, dst: list(paths.all_paths(src, dst))]:
+            try:
+                fn(0, "isolated")
+            except nx.NetworkXNoPath:
+                continue
+
+            assert False
@@ -0,0 +1,293 @@
+import json
+import random
+import tarfile
+from io import BytesIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from pfsim.configuration import Scenario
+from pfsim.job import Job
+from pfsim.simulation import Simulation
+from pfsim.simulation_runner import _group_by_timeline
+from pfsim.traffic_matrix import TrafficMatrix
+
+
+def _write_trace(path, n_procs):
+    with tarfile.open(str(path), mode="w:gz") as tar:
+        for rank in range(n_procs):
+            buf = json.dumps({
+                "rank": rank,
+                "tx_messages": [int(rank != dst) for dst in range(n_procs)],
+                "tx_bytes": [100 * (rank + dst) for dst in range(n_procs)]
+            }).encode()
+
+            tarinfo = tarfile.TarInfo(name="pfprof{0}.json".format(rank))
+            tarinfo.size = len(buf)
+            tar.addfile(tarinfo, fileobj=BytesIO(buf))
+
+
+def _scenario(**kwargs):
+    conf = {
+        "duration": 200.0,
+        "topology": [{
+            "kind": "pfsim.topology.XGFTTopology",
+            "params": {"h": 2, "m": [4, 4], "w": [1, 2], "npe": 4}
+        }],
+        "output": "output",
+        "algorithms": {
+            "scheduler": ["pfsim.scheduler.FCFSScheduler"],
+            "host_selector": ["pfsim.host_selector.RandomHostSelector"],
+            "process_mapper": ["pfsim.process_mapper.LinearProcessMapper"],
+            "router": ["pfsim.router.GreedyRouter"]
+        },
+        "jobs": [{
+            "submit": {
+                "distribution": "pfsim.math.ExponentialDistribution",
+                "params": {"lambd": 0.5}
+            },
+            "duration": {
+                "distribution": "pfsim.math.ExponentialDistribution",
+                "params": {"lambd": 0.2}
+            },
+            "trace": "trace.tar.gz"
+        }]
+    }
+    conf.update(kwargs)
+
+    return next(Scenario.generate_from_yaml(conf))
+
+
+def _read(path):
+    with open(str(path)) as f:
+        return f.read()
+
+
+def _read_csvs(path):
+    return {p.name: _read(p) for p in Path(path).glob("*.csv")}
+
+
+SCHEDULER_CSVS = [
+    "Number of Waiting Jobs.csv",
+    "Number of Jobs in System.csv",
+    "Number of Running Jobs.csv",
+    "Number of Finished Jobs.csv",
+    "Job Wait Time.csv",
+    "Job Response Time.csv"
+]
+
+
+class TestSimulation:
+    def setup(self):
+        self.tmpdir = TemporaryDirectory()
+        self.base_path = Path(self.tmpdir.name)
+        _write_trace(self.base_path / "trace.tar.gz", 16)
+
+    def teardown(self):
+        self.tmpdir.cleanup()
+
+    def test_run(self):
+        sim = Simulation(self.base_path, _scenario())
+        sim.run()
+
+        assert (sim.output_path / "result.txt").exists()
+        assert sim.simulator.time <= 200.0
+        assert sim.cluster.scheduler.n_finished > 0
+
+    def test_checkpoint(self):
+        random.seed(0)
+        sim = Simulation(self.base_path, _scenario())
+        sim.run()
+        expected = _read_csvs(sim.output_path)
+
+        random.seed(0)
+        sim = Simulation(self.base_path, _scenario())
+        sim.simulator.run_until(50.0)
+        sim.checkpoint(self.base_path / "warm.pickle")
+        # Diverge from the checkpointed state
+        random.seed(1)
+
+        for i in range(2):
+            fork = Simulation.restore(self.base_path / "warm.pickle",
+                                      self.base_path / "fork{0}".format(i))
+            fork.run()
+
+            assert _read_csvs(fork.output_path) == expected
+
+    def test_checkpoint_interval(self):
+        random.seed(0)
+        sim = Simulation(self.base_path, _scenario())
+        sim.run()
+        expected = _read_csvs(sim.output_path)
+
+        random.seed(0)
+        sim = Simulation(self.base_path, _scenario(checkpoint_interval=30.0))
+        sim.run()
+
+        assert _read_csvs(sim.output_path) == expected
+        assert not sim.checkpoint_path.exists()
+
+    def test_checkpoint_sparse_events(self):
+        # Jobs arrive far less often than checkpoints are taken
+        jobs = _scenario().jobs
+        jobs = [jobs[0]._replace(submit_params={"lambd": 0.01})]
+
+        random.seed(0)
+        sim = Simulation(self.base_path, _scenario()._replace(jobs=jobs))
+        sim.run()
+        expected = _read_csvs(sim.output_path)
+
+        random.seed(0)
+        sim = Simulation(self.base_path, _scenario(checkpoint_interval=5.0)
+                         ._replace(jobs=jobs))
+        times = []
+        sim.checkpoint = lambda path: times.append(sim.simulator.time)
+        sim.run()
+
+        assert len(times) == 39
+        assert _read_csvs(sim.output_path) == expected
+
+    def test_replay(self):
+        random.seed(0)
+        sim = Simulation(self.base_path, _scenario(), record=True)
+        sim.run()
+        expected = _read_csvs(sim.output_path)
+
+        assert len(sim.timeline) > 0
+
+        # Replaying with the same router reproduces the whole simulation
+        random.seed(1)
+        replay = Simulation(self.base_path, _scenario(output="replay"),
+                            timeline=sim.timeline)
+        replay.run()
+
+        assert replay.job_generators == []
+        assert _read_csvs(replay.output_path) == expected
+
+    def test_replay_router(self):
+        random.seed(0)
+        sim = Simulation(self.base_path, _scenario(), record=True)
+        sim.run()
+        expected = _read_csvs(sim.output_path)
+
+        conf = _scenario(output="replay", algorithms={
+            "scheduler": ["pfsim.scheduler.FCFSScheduler"],
+            "host_selector": ["pfsim.host_selector.RandomHostSelector"],
+            "process_mapper": ["pfsim.process_mapper.LinearProcessMapper"],
+            "router": ["pfsim.router.RandomRouter"]
+        })
+        replay = Simulation(self.base_path, conf, timeline=sim.timeline)
+        replay.run()
+        actual = _read_csvs(replay.output_path)
+
+        for name in SCHEDULER_CSVS:
+            assert actual[name] == expected[name]
+
+    def test_route_cache(self):
+        algorithms = {
+            "scheduler": ["pfsim.scheduler.FCFSScheduler"],
+            "host_selector": ["pfsim.host_selector.RandomHostSelector"],
+            "process_mapper": ["pfsim.process_mapper.LinearProcessMapper"],
+            "router": ["pfsim.router.RandomRouter"]
+        }
+
+        random.seed(0)
+        sim = Simulation(self.base_path, _scenario(
+            algorithms=algorithms, route_cache="routes", router_seed=1))
+        sim.run()
+        expected = _read_csvs(sim.output_path)
+
+        assert len(list((self.base_path / "routes").glob("*.routes"))) == 1
+
+        # Routes loaded from the cache give the same results
+        random.seed(0)
+        sim = Simulation(self.base_path, _scenario(
+            algorithms=algorithms, route_cache="routes", router_seed=1,
+            output="cached"))
+        assert len(sim.cluster.router.cache.table) > 0
+        sim.run()
+
+        assert _read_csvs(sim.output_path) == expected
+
+    def test_trace_workers(self):
+        workers = TrafficMatrix.WORKERS
+        conf = _scenario(trace_workers=2)
+        trace = str(self.base_path / "trace.tar.gz")
+
+        try:
+            with patch.object(TrafficMatrix, "_load",
+                              return_value=TrafficMatrix(4)) as load:
+                # Traces of the scenario are parsed by its own workers
+                Simulation.preload(self.base_path, [conf])
+                assert load.call_args[0][1] == 2
+
+                TrafficMatrix._preloaded.clear()
+                TrafficMatrix._cache.pop(trace, None)
+                load.reset_mock()
+                sim = Simulation(self.base_path, conf)
+                sim.job_generators[0]._submit_job()
+                assert load.call_args[0][1] == 2
+
+            # The default of other scenarios is left alone
+            assert TrafficMatrix.WORKERS == workers
+        finally:
+            Simulation._topologies.clear()
+            TrafficMatrix._preloaded.clear()
+            TrafficMatrix._cache.pop(trace, None)
+
+    def test_preload(self):
+        conf = _scenario()
+        trace = str(self.base_path / "trace.tar.gz")
+
+        try:
+            Simulation.preload(self.base_path, [conf, conf])
+
+            assert len(Simulation._topologies) == 1
+            assert trace in TrafficMatrix._preloaded
+
+            # Scenarios use the preloaded topology and traces
+            sim = Simulation(self.base_path, conf)
+            assert sim.cluster.graph is \
+                list(Simulation._topologies.values())[0]
+
+            job = Job.from_trace(sim.job_generators[0].trace)
+            assert job.traffic_matrix is TrafficMatrix._preloaded[trace]
+        finally:
+            Simulation._topologies.clear()
+            TrafficMatrix._preloaded.clear()
+
+    def test_preload_missing_trace(self):
+        missing = _scenario()
+        missing = missing._replace(jobs=[missing.jobs[0]._replace(
+            trace=str(self.base_path / "missing.tar.gz"))])
+        conf = _scenario(output="other")
+
+        try:
+            # The other scenarios are still preloaded
+            Simulation.preload(self.base_path, [missing, conf])
+
+            assert len(Simulation._topologies) == 1
+            assert list(TrafficMatrix._preloaded) == \
+                [str(self.base_path / "trace.tar.gz")]
+        finally:
+            Simulation._topologies.clear()
+            TrafficMatrix._preloaded.clear()
+
+
+class TestGroupByTimeline:
+    def test_group(self):
+        confs = [_scenario(output=str(i % 2)) for i in range(4)]
+        confs = [conf._replace(id=i, router=str(i)) for i, conf in
+                 enumerate(confs)]
+        groups = _group_by_timeline(confs)
+
+        assert [[conf.id for conf in group] for group in groups] == \
+            [[0, 2], [1, 3]]
+
+    def test_no_share(self):
+        confs = [_scenario(share_timeline=False)._replace(id=i)
+                 for i in range(2)]
+        groups = _group_by_timeline(confs)
+
+        assert [[conf.id for conf in group] for group in groups] == \
+            [[0], [1]]
@@ -1,5 +1,7 @@
+from io import StringIO
 from unittest.mock import MagicMock, call
 
+from pfsim.event_queue import LadderQueue
 from pfsim.simulator import Simulator
 
 
@@ -65,3 +67,125 @@ class TestSimulator:
         self.sim.register("test", _handler2, prio=0)
         self.sim.schedule("test")
         self.sim.run()
+
+    def test_entity_subscription(self):
+        _handler1 = MagicMock()
+        _handler2 = MagicMock()
+        entity1 = object()
+        entity2 = object()
+
+        self.sim.subscribe("test", _handler1, entity=entity1)
+        self.sim.subscribe("test", _handler2, entity=entity2)
+        self.sim.schedule("test", 1.0, x=entity1)
+        self.sim.schedule("test", 2.0, x=entity1)
+        self.sim.schedule("test", 3.0, x=None)
+        self.sim.run()
+
+        _handler1.assert_has_calls([call(x=entity1), call(x=entity1)])
+        assert _handler1.call_count == 2
+        _handler2.assert_not_called()
+
+    def test_entity_priority(self):
+        order = []
+        entity = object()
+
+        self.sim.subscribe("test", lambda x: order.append(1), prio=1)
+        self.sim.subscribe("test", lambda x: order.append(2), entity=entity)
+        self.sim.subscribe("test", lambda x: order.append(3))
+        self.sim.subscribe("test", lambda x: order.append(0), prio=2,
+                           entity=entity)
+        self.sim.schedule("test", x=entity)
+        self.sim.run()
+
+        assert order == [0, 1, 2, 3]
+
+    def test_unsubscribe(self):
+        _handler = MagicMock()
+        entity = object()
+
+        self.sim.subscribe("test", _handler)
+        self.sim.subscribe("test", _handler, entity=entity)
+        self.sim.unsubscribe("test", _handler)
+        self.sim.unsubscribe("test", _handler, entity=entity)
+        self.sim.schedule("test", x=entity)
+        self.sim.run()
+
+        _handler.assert_not_called()
+        assert "test" not in self.sim.event_handlers
+        assert "test" not in self.sim.entity_handlers
+
+    def test_release(self):
+        _handler = MagicMock()
+        entity = object()
+
+        def _release(x):
+            self.sim.release(x)
+
+        self.sim.subscribe("foo", _release, prio=1, entity=entity)
+        self.sim.subscribe("foo", _handler, entity=entity)
+        self.sim.subscribe("bar", _handler, entity=entity)
+        self.sim.schedule("foo", 1.0, x=entity)
+        self.sim.schedule("bar", 2.0, x=entity)
+        self.sim.run()
+
+        # Handlers of the event being dispatched still run
+        _handler.assert_called_once_with(x=entity)
+        assert not self.sim.entity_handlers
+
+    def test_queue(self):
+        _handler = MagicMock()
+
+        sim = Simulator(queue=LadderQueue())
+        sim.register("test", _handler)
+        sim.schedule("test", 2.0, x=2)
+        sim.schedule("test", 1.0, x=1)
+        sim.schedule("test", 1.0, x=3)
+        sim.run_until(1.5)
+
+        assert sim.time == 1.0
+        _handler.assert_has_calls([call(x=1), call(x=3)])
+
+        sim.run()
+
+        assert sim.time == 2.0
+        _handler.assert_called_with(x=2)
+
+    def test_cancel(self):
+        _handler = MagicMock()
+
+        self.sim.register("test", _handler)
+        ev1 = self.sim.schedule("test", 1.0, x=1)
+        ev2 = self.sim.schedule("test", 2.0, x=2)
+
+        assert self.sim.cancel(ev2)
+        self.sim.run()
+
+        _handler.assert_called_once_with(x=1)
+        assert self.sim.time == 1.0
+        assert not self.sim.cancel(ev1)
+
+    def test_profile(self):
+        def _handler(x):
+            pass
+
+        sim = Simulator(profile=True)
+        sim.register("test", _handler)
+        sim.register("test", _handler, prio=1)
+        sim.schedule("test", 1.0, x=1)
+        sim.schedule("test", 2.0, x=2)
+        sim.run()
+
+        stats = sim.profiler.stats[("test", _handler)]
+        assert stats.count == 4
+        assert 0.0 <= stats.max <= stats.total
+
+        with StringIO() as f:
+            sim.profiler.write_csv(f)
+            rows = f.getvalue().splitlines()
+
+        assert rows[0] == "Event,Handler,Calls,Total,Mean,Max"
+        assert rows[1].startswith("test,")
+        assert "test_profile.<locals>._handler,4," in rows[1]
+
+    def test_no_profile(self):
+        assert self.sim.profiler is None
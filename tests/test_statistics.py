@@ -1,7 +1,9 @@
 from io import StringIO
 from math import isnan
 
-from pfsim.statistics import Samples, TimeSeriesSamples
+import numpy as np
+
+from pfsim.statistics import MaxSegmentTree, Samples, TimeSeriesSamples
 
 
 class TestTimedSamples:
@@ -125,3 +127,27 @@ class TestSamples:
                                    "1.0\n"\
                                    "2.0\n"\
                                    "3.0\n"
+
+
+class TestMaxSegmentTree:
+    def test_empty(self):
+        tree = MaxSegmentTree(np.empty(0))
+
+        assert len(tree) == 0
+        assert tree.max == -float("inf")
+
+    def test_update(self):
+        rng = np.random.RandomState(0)
+
+        for n in [1, 2, 5, 16, 33]:
+            values = rng.randint(0, 100, n)
+            tree = MaxSegmentTree(values)
+
+            assert tree.max == values.max()
+
+            for _ in range(20):
+                ids = rng.choice(n, min(n, 3), replace=False)
+                values[ids] = rng.randint(0, 100, len(ids))
+                tree.update(ids, values[ids])
+
+                assert tree.max == values.max()
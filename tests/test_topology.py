@@ -5,7 +5,7 @@ from pfsim.topology import NDTorusTopology, XGFTTopology
 
 class TestTorusTopology:
     def test_1d(self):
-        g = NDTorusTopology(1, [4]).generate()
+        g = NDTorusTopology(1, [4]).generate().to_networkx()
 
         assert len(g) == 4
         assert all([d == 2 for d in g.in_degree().values()])
@@ -13,7 +13,7 @@ class TestTorusTopology:
         assert nx.number_strongly_connected_components(g) == 1
 
     def test_2d(self):
-        g = NDTorusTopology(2, [3, 4]).generate()
+        g = NDTorusTopology(2, [3, 4]).generate().to_networkx()
 
         assert len(g) == 12
         assert all([d == 4 for d in g.in_degree().values()])
@@ -21,7 +21,7 @@ class TestTorusTopology:
         assert nx.number_strongly_connected_components(g) == 1
 
     def test_3d(self):
-        g = NDTorusTopology(3, [3, 4, 5]).generate()
+        g = NDTorusTopology(3, [3, 4, 5]).generate().to_networkx()
 
         assert len(g) == 60
         assert all([d == 6 for d in g.in_degree().values()])
@@ -29,13 +29,38 @@ class TestTorusTopology:
         assert nx.number_strongly_connected_components(g) == 1
 
     def test_4d(self):
-        g = NDTorusTopology(4, [4, 5, 6, 7]).generate()
+        g = NDTorusTopology(4, [4, 5, 6, 7]).generate().to_networkx()
 
         assert len(g) == 840
         assert all([d == 8 for d in g.in_degree().values()])
         assert all([d == 8 for d in g.out_degree().values()])
         assert nx.number_strongly_connected_components(g) == 1
 
+    def test_short_dims(self):
+        g = NDTorusTopology(3, [2, 1, 3]).generate().to_networkx()
+
+        # Both neighbors are the same node along a dimension of size 2, and
+        # a dimension of size 1 adds a self-loop
+        assert len(g) == 6
+        assert g.successors(0) == [1, 0, 2, 4]
+        assert g.number_of_edges() == 24
+
+    def test_coords(self):
+        g = NDTorusTopology(3, [3, 4, 5]).generate().to_networkx()
+
+        assert g.graph["dims"] == [3, 4, 5]
+        assert g.node[0]["coords"] == (0, 0, 0)
+        assert g.node[1]["coords"] == (1, 0, 0)
+        assert g.node[3]["coords"] == (0, 1, 0)
+        assert g.node[59]["coords"] == (2, 3, 4)
+
+        # Neighbors differ by one in a single dimension, modulo its size
+        for u, v in g.edges_iter():
+            diff = [(b - a) % k for a, b, k in zip(
+                g.node[u]["coords"], g.node[v]["coords"], [3, 4, 5])]
+            assert sorted(diff)[:2] == [0, 0]
+            assert any(d in (1, k - 1) for d, k in zip(diff, [3, 4, 5]))
+
 
 class TestXGFTTopology:
     #  Test cases are taken from X. Yuan, W. Nienaber, and S. Mahapatra, “ On
@@ -43,7 +68,7 @@ class TestXGFTTopology:
     #  Parallel Comput., vol. 2, no. 4, pp. 1–22, Jan. 2016.
 
     def test_host(self):
-        g = XGFTTopology(0, [], []).generate()
+        g = XGFTTopology(0, [], []).generate().to_networkx()
 
         assert len(g) == 1
         assert nx.number_strongly_connected_components(g) == 1
@@ -53,7 +78,7 @@ class TestXGFTTopology:
         assert len(hosts) == 1
 
     def test_1lv_ft(self):
-        g = XGFTTopology(1, [4], [1]).generate()
+        g = XGFTTopology(1, [4], [1]).generate().to_networkx()
 
         assert len(g) == 5
         assert nx.number_strongly_connected_components(g) == 1
@@ -66,7 +91,7 @@ class TestXGFTTopology:
         assert len(switches) == 1
 
     def test_2lv_ft(self):
-        g = XGFTTopology(2, [4, 4], [1, 2]).generate()
+        g = XGFTTopology(2, [4, 4], [1, 2]).generate().to_networkx()
 
         assert len(g) == 22
         assert nx.number_strongly_connected_components(g) == 1
@@ -78,7 +103,7 @@ class TestXGFTTopology:
         assert len(switches) == 6
 
     def test_3lv_ft(self):
-        g = XGFTTopology(3, [4, 4, 3], [1, 2, 2]).generate()
+        g = XGFTTopology(3, [4, 4, 3], [1, 2, 2]).generate().to_networkx()
 
         assert len(g) == 70
         assert nx.number_strongly_connected_components(g) == 1
@@ -88,3 +113,23 @@ class TestXGFTTopology:
         assert len(hosts) == 48
         switches = [u for u, d in g.nodes(data=True) if d["typ"] == "switch"]
         assert len(switches) == 22
+
+    def test_labels(self):
+        g = XGFTTopology(2, [3, 2], [2, 2]).generate().to_networkx()
+
+        assert g.graph["m"] == [3, 2]
+        assert g.graph["w"] == [2, 2]
+
+        levels = [d["level"] for _, d in g.nodes_iter(data=True)]
+        assert levels.count(0) == 6
+        assert levels.count(1) == 4
+        assert levels.count(2) == 4
+
+        # Every node has distinct coordinates within its level
+        coords = {(d["level"], d["coords"]) for _, d in g.nodes_iter(True)}
+        assert len(coords) == len(g)
+
+        # Hosts are connected to the top switches of their subtree
+        for u, v in g.edges_iter():
+            if g.node[u]["level"] == 0:
+                assert g.node[u]["coords"][1:] == g.node[v]["coords"][1:]
@@ -1,8 +1,12 @@
 import json
 import tarfile
 from io import BytesIO
+from os import utime
+from tempfile import TemporaryDirectory
 
-from pfsim.traffic_matrix import TrafficMatrix
+import numpy as np
+
+from pfsim.traffic_matrix import TrafficMatrix, packed_path
 
 
 FIXTURES = [
@@ -83,3 +87,160 @@ class TestTrafficMatrix:
         assert g.has_edge(2, 1)
         assert g.has_edge(2, 3)
         assert g.has_edge(3, 2)
+
+    def test_coo(self):
+        tm = TrafficMatrix.load(self.file)
+        src, dst, traffic = tm.coo
+
+        assert list(zip(src.tolist(), dst.tolist(), traffic.tolist())) == \
+            [(s, d, t) for (s, d), t in tm.dok.items()]
+
+    def test_sorted(self):
+        tm = TrafficMatrix(3, {(2, 0): 1, (0, 2): 2, (0, 1): 3})
+
+        assert tm.src.tolist() == [0, 0, 2]
+        assert tm.dst.tolist() == [1, 2, 0]
+        assert tm.traffic.tolist() == [3, 2, 1]
+        assert tm.indptr.tolist() == [0, 2, 2, 3]
+        assert list(tm.dok) == [(0, 1), (0, 2), (2, 0)]
+
+    def test_from_elements(self):
+        tm = TrafficMatrix.from_elements(2, [1, 0, 1], [0, 1, 0], [1, 2, 3])
+
+        assert tm.dok == {(0, 1): 2, (1, 0): 4}
+
+    def test_permute(self):
+        tm = TrafficMatrix.load(self.file).permute([3, 2, 1, 0])
+
+        assert tm.dok == {
+            (3, 2): 100,
+            (3, 1): 200,
+            (2, 3): 150,
+            (1, 2): 250,
+            (1, 0): 150,
+            (0, 1): 100
+        }
+
+    def test_aggregate(self):
+        tm = TrafficMatrix.load(self.file)
+        hosts, counts = tm.aggregate([0, 0, 1, 1], 2, return_counts=True)
+
+        assert hosts.n_procs == 2
+        assert hosts.dok == {(0, 0): 250, (0, 1): 200, (1, 0): 250,
+                             (1, 1): 250}
+        assert counts.tolist() == [2, 1, 1, 2]
+
+    def test_top_k(self):
+        tm = TrafficMatrix.load(self.file)
+        src, dst, traffic = tm.coo
+        order = tm.top_k(3)
+
+        # Ties in the order of the matrix
+        assert list(zip(src[order].tolist(), dst[order].tolist())) == \
+            [(2, 1), (0, 2), (1, 0)]
+        assert len(tm.top_k()) == 6
+
+    def test_transpose(self):
+        tm = TrafficMatrix.load(self.file)
+
+        assert tm.transpose().dok == {(dst, src): traffic for (src, dst),
+                                      traffic in tm.dok.items()}
+
+    def test_symmetrize(self):
+        tm = TrafficMatrix.load(self.file).symmetrize()
+
+        assert tm.dok == {
+            (0, 1): 250,
+            (1, 0): 250,
+            (0, 2): 200,
+            (2, 0): 200,
+            (1, 2): 250,
+            (2, 1): 250,
+            (2, 3): 250,
+            (3, 2): 250
+        }
+
+    def test_scale(self):
+        tm = TrafficMatrix.load(self.file).scale(0.5)
+
+        assert tm.dok[(0, 1)] == 50
+        assert len(tm) == 6
+
+    def test_parallel(self):
+        expected = TrafficMatrix._load(self.file, 1)
+
+        batch_size = TrafficMatrix.BATCH_SIZE
+        TrafficMatrix.BATCH_SIZE = 1
+
+        try:
+            for workers in [1, 2]:
+                self.file.seek(0)
+                tm = TrafficMatrix._load(self.file, workers)
+
+                assert tm.n_procs == 4
+                assert tm.dok == expected.dok
+        finally:
+            TrafficMatrix.BATCH_SIZE = batch_size
+
+    def test_cache(self):
+        with TemporaryDirectory() as tmpdir:
+            paths = []
+            for i in range(3):
+                paths.append("{0}/trace{1}.tar.gz".format(tmpdir, i))
+                with open(paths[-1], "wb") as f:
+                    f.write(self.file.getvalue())
+
+            cache_size = TrafficMatrix.CACHE_SIZE
+            TrafficMatrix.CACHE_SIZE = 2
+
+            try:
+                for path in paths[:2] + paths[:1] + paths[2:]:
+                    with open(path, "rb") as f:
+                        TrafficMatrix.load(f)
+
+                # The least recently used trace is evicted
+                assert list(TrafficMatrix._cache) == [paths[0], paths[2]]
+            finally:
+                TrafficMatrix.CACHE_SIZE = cache_size
+                for path in paths:
+                    TrafficMatrix._cache.pop(path, None)
+
+    def test_packed(self):
+        tm = TrafficMatrix.load(self.file)
+
+        buf = BytesIO()
+        tm.save(buf)
+        buf.seek(0)
+        packed = TrafficMatrix.load(buf)
+
+        assert packed.n_procs == 4
+        assert len(packed) == 6
+        assert packed.dok == tm.dok
+        for a, b in zip(packed.coo, tm.coo):
+            assert a.tolist() == b.tolist()
+
+    def test_pack(self):
+        with TemporaryDirectory() as tmpdir:
+            path = "{0}/trace.tar.gz".format(tmpdir)
+            with open(path, "wb") as f:
+                f.write(self.file.getvalue())
+
+            out_path = TrafficMatrix.pack(path)
+            assert out_path == packed_path(path)
+
+            # Packed traces are memory-mapped
+            with open(str(out_path), "rb") as f:
+                tm = TrafficMatrix._load_any(f)
+            assert isinstance(tm.coo[0], np.memmap)
+            assert tm.n_procs == 4
+            assert len(tm.dok) == 6
+
+            # and used in place of the tarball unless it is newer
+            with open(path, "rb") as f:
+                assert isinstance(TrafficMatrix._load_any(f).coo[0],
+                                  np.memmap)
+
+            utime(str(out_path), (0, 0))
+            with open(path, "rb") as f:
+                assert not isinstance(TrafficMatrix._load_any(f).src,
+                                      np.memmap)